@@ -0,0 +1,139 @@
+# anomalies.py
+
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+class OverlapDetector:
+    """
+    Finds overlapping shifts for each worker incrementally. Every worker's
+    shifts are kept sorted by start time together with the longest shift
+    seen, so the only shifts that can overlap a new one are those starting
+    less than that duration before it ends. Each new shift costs a binary
+    search plus a check of those candidates, and every overlapping pair is
+    recorded, including shifts contained in a longer one.
+    """
+    def __init__(self):
+        """
+        Create an empty detector.
+        """
+        self._shifts = {}       # worker_id -> sorted [(start, end, height, tx_index), ...]
+        self._longest = {}      # worker_id -> longest shift duration seen
+        self._overlaps = {}     # (earlier key, later key) -> anomaly record
+        self._partners = {}     # (height, tx_index) -> keys of shifts it overlaps
+        self._sorted = None     # cached anomalies() result
+        self._lock = threading.Lock()
+
+    def connect(self, blocks):
+        """
+        Add the shifts of blocks appended to the active chain.
+
+        Args:
+            blocks (list): Blocks in height order, each with its "height".
+        """
+        with self._lock:
+            for b in blocks:
+                for i, tx in enumerate(b["transactions"]):
+                    self._add(tx, b["height"], i)
+
+    def disconnect(self, blocks):
+        """
+        Remove the shifts of blocks rolled back from the active chain, with their overlaps.
+
+        Args:
+            blocks (list): Blocks in height order, each with its "height".
+        """
+        with self._lock:
+            for b in reversed(blocks):
+                for i, tx in enumerate(b["transactions"]):
+                    self._remove(tx, b["height"], i)
+
+    def apply_reorg(self, connected, disconnected=()):
+        """
+        Update the detector after the active chain changes.
+
+        Args:
+            connected (list): Blocks added to the active chain.
+            disconnected (list, optional): Blocks removed from the active chain. Defaults to ().
+        """
+        self.disconnect(disconnected)
+        self.connect(connected)
+
+    def anomalies(self):
+        """
+        Return every recorded overlap.
+
+        Returns:
+            list: Dicts with worker_id, block1, block2 (block of the earlier-starting
+                shift first), overlap_start and overlap_end, ordered by worker and time.
+        """
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._overlaps.values(),
+                                      key=lambda a: (a["worker_id"], a["overlap_start"],
+                                                     a["block1"], a["block2"]))
+            return list(self._sorted)
+
+    @staticmethod
+    def _interval(tx):
+        """
+        Parse a shift into its start and end times.
+
+        Args:
+            tx (dict): The transaction.
+
+        Returns:
+            tuple or None: (start, end) datetimes, or None if the times do not parse.
+        """
+        try:
+            return (datetime.fromisoformat(f"{tx['date']}T{tx['shift_start']}"),
+                    datetime.fromisoformat(f"{tx['date']}T{tx['shift_end']}"))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _add(self, tx, height, i):
+        span = self._interval(tx)
+        if span is None:
+            return
+        start, end = span
+        w = tx["worker_id"]
+        shifts = self._shifts.setdefault(w, [])
+        longest = self._longest.get(w, timedelta(0))
+        key = (height, i)
+        lo = bisect_left(shifts, (start - longest,))
+        hi = bisect_left(shifts, (end,))
+        for s, e, h, j in shifts[lo:hi]:
+            if max(s, start) < min(e, end):
+                first, second = sorted(((s, (h, j)), (start, key)))
+                pair = (first[1], second[1])
+                self._overlaps[pair] = {
+                    "worker_id": w, "block1": pair[0][0], "block2": pair[1][0],
+                    "overlap_start": max(s, start).isoformat(),
+                    "overlap_end": min(e, end).isoformat()
+                }
+                self._partners.setdefault((h, j), set()).add(key)
+                self._partners.setdefault(key, set()).add((h, j))
+                self._sorted = None
+        insort(shifts, (start, end, height, i))
+        if end - start > longest:
+            self._longest[w] = end - start
+
+    def _remove(self, tx, height, i):
+        span = self._interval(tx)
+        if span is None:
+            return
+        w = tx["worker_id"]
+        shifts = self._shifts.get(w, [])
+        entry = (span[0], span[1], height, i)
+        pos = bisect_left(shifts, entry)
+        if pos < len(shifts) and shifts[pos] == entry:
+            del shifts[pos]
+            if not shifts:
+                del self._shifts[w]
+                self._longest.pop(w, None)
+        key = (height, i)
+        for other in self._partners.pop(key, ()):
+            self._overlaps.pop((key, other), None)
+            self._overlaps.pop((other, key), None)
+            self._partners.get(other, set()).discard(key)
+            self._sorted = None
@@ -0,0 +1,92 @@
+# approvals.py
+
+import json
+import os
+import threading
+
+class Approvals:
+    """
+    Supervisor decisions on confirmed shifts, kept apart from the blocks.
+
+    A shift's "supervisor_signature" is committed to by its block's Merkle root
+    as it was mined, so a decision made later cannot be written into the block
+    without breaking its proofs and its validation on other peers. Decisions
+    are recorded here by (block hash, tx index) and laid over the transactions
+    when they are served. With a log file they are appended as JSON lines and
+    survive restarts; the latest decision for a shift wins.
+    """
+    def __init__(self):
+        """
+        Create an empty, in-memory record.
+        """
+        self._by_block = {}     # block hash -> {tx_index: supervisor_signature}
+        self._log = None
+        self._lock = threading.Lock()
+
+    def open(self, path):
+        """
+        Load decisions from a log file and append new ones to it. A torn line
+        left by a crash mid-write is skipped.
+
+        Args:
+            path (str): The log file.
+        """
+        with self._lock:
+            if os.path.exists(path):
+                with open(path) as f:
+                    for line in f:
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._by_block.setdefault(rec["block_hash"], {})[rec["tx_index"]] = \
+                            rec["supervisor_signature"]
+            self._log = open(path, "a")
+
+    def record(self, block_hash, tx_index, signature):
+        """
+        Record a decision on one shift.
+
+        Args:
+            block_hash (str): Hash of the block holding the shift.
+            tx_index (int): Position of the shift in the block.
+            signature (str): The supervisor's signature or decision.
+        """
+        with self._lock:
+            if self._log is not None:
+                self._log.write(json.dumps({"block_hash": block_hash, "tx_index": tx_index,
+                                            "supervisor_signature": signature}) + "\n")
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            self._by_block.setdefault(block_hash, {})[tx_index] = signature
+
+    def transaction(self, block, tx_index):
+        """
+        Return one transaction of a block with its decision applied.
+
+        Args:
+            block (dict): The block as mined.
+            tx_index (int): Position of the transaction.
+
+        Returns:
+            dict: The transaction, copied if a decision changes it.
+        """
+        tx = block["transactions"][tx_index]
+        sig = self._by_block.get(block["hash"], {}).get(tx_index)
+        return tx if sig is None else dict(tx, supervisor_signature=sig)
+
+    def apply(self, block):
+        """
+        Return a block with the decisions on its shifts applied.
+
+        Args:
+            block (dict): The block as mined.
+
+        Returns:
+            dict: The block, copied if any of its shifts has a decision.
+        """
+        decided = self._by_block.get(block["hash"])
+        if not decided:
+            return block
+        return dict(block, transactions=[self.transaction(block, i)
+                                         for i in range(len(block["transactions"]))])
@@ -0,0 +1,104 @@
+# bench_chainstate.py
+
+import sys
+import threading
+import time
+from chainstate import ChainState
+
+PAGE = 100          # blocks a reader takes per read, like one /chain page
+READ_GAP = 0.0005   # seconds each reader pauses between reads, like request handling
+
+def make_block(height):
+    """
+    Build a small stand-in block.
+
+    Args:
+        height (int): Block height.
+
+    Returns:
+        dict: The block.
+    """
+    return {"index": height, "height": height, "hash": f"{height:064x}", "transactions": []}
+
+def locked_read(state):
+    """
+    Read the way handlers did before snapshots: take the writer lock and copy
+    the chain so it cannot change underneath.
+
+    Args:
+        state (ChainState): The chain state.
+
+    Returns:
+        int: Blocks read.
+    """
+    with state.lock:
+        chain = list(state.snapshot())
+    return len(chain[-PAGE:])
+
+def snapshot_read(state):
+    """
+    Read from the published snapshot without taking the lock.
+
+    Args:
+        state (ChainState): The chain state.
+
+    Returns:
+        int: Blocks read.
+    """
+    return len(state.snapshot()[-PAGE:])
+
+def run(read, readers, seconds, hold):
+    """
+    Append blocks from one writer for `seconds` while `readers` threads keep
+    reading, and measure writer throughput and read latency.
+
+    Args:
+        read (callable): Reader operation.
+        readers (int): Number of reader threads.
+        seconds (float): How long the writer runs.
+        hold (float): Seconds the writer holds the lock per block, standing in
+            for validation and index updates.
+
+    Returns:
+        tuple: (writer blocks per second, reads per second, median and 99th
+            percentile read latency in seconds).
+    """
+    state = ChainState([make_block(h) for h in range(10000)])
+    done = threading.Event()
+    latencies = [[] for _ in range(readers)]
+
+    def reader(k):
+        while not done.is_set():
+            t = time.perf_counter()
+            read(state)
+            latencies[k].append(time.perf_counter() - t)
+            time.sleep(READ_GAP)
+
+    threads = [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    blocks = 0
+    while time.perf_counter() - start < seconds:
+        blocks += 1
+        with state.lock:
+            if hold:
+                time.sleep(hold)
+            state.switch(len(state) - 1, [make_block(len(state))])
+    elapsed = time.perf_counter() - start
+    done.set()
+    for t in threads:
+        t.join()
+    samples = sorted(x for per in latencies for x in per)
+    return (blocks / elapsed, len(samples) / elapsed,
+            samples[len(samples) // 2], samples[len(samples) * 99 // 100])
+
+if __name__ == "__main__":
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    hold = float(sys.argv[3]) if len(sys.argv) > 3 else 0.001
+
+    for name, read in (("locked", locked_read), ("snapshot", snapshot_read)):
+        writes, reads, p50, p99 = run(read, readers, seconds, hold)
+        print(f"{name:>9}: writer {writes:>7.1f} blocks/s, {reads:>8.0f} reads/s, "
+              f"read p50 {p50 * 1e6:>8.1f} µs, p99 {p99 * 1e6:>8.1f} µs")
@@ -0,0 +1,61 @@
+# bench_codec.py
+
+import sys
+import time
+from ecdsa import SigningKey
+from blockchain import Block, Transaction
+from wire import BINARY, JSON, encode_msg, HEADER
+from codec import decode_payload
+
+def make_chain(blocks, txs_per_block):
+    """
+    Build an unmined chain of signed shift transactions for measuring encodings.
+
+    Args:
+        blocks (int): Number of blocks.
+        txs_per_block (int): Transactions per block.
+
+    Returns:
+        list: Blocks as dictionaries.
+    """
+    sk = SigningKey.generate()
+    chain, prev = [], "0" * 64
+    for i in range(blocks):
+        txs = []
+        for j in range(txs_per_block):
+            tx = Transaction(f"W{j:03d}", "2025-05-02", "09:00", "17:00")
+            tx.sign_worker(sk)
+            tx.sign_supervisor(sk)
+            txs.append(tx)
+        b = Block(i, prev, txs, 3).to_dict()
+        chain.append(b)
+        prev = b["hash"]
+    return chain
+
+def measure(frames):
+    """
+    Decode every frame and report total size and decode time.
+
+    Args:
+        frames (list): Encoded frames.
+
+    Returns:
+        tuple: (total bytes, seconds spent decoding).
+    """
+    start = time.perf_counter()
+    for f in frames:
+        decode_payload(f[HEADER.size:])
+    return sum(len(f) for f in frames), time.perf_counter() - start
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    chain = make_chain(n, per)
+    msgs = [{"type": "BLOCK", "block": b} for b in chain]
+
+    for name, codec, compress in (("json", JSON, False), ("binary", BINARY, False),
+                                  ("binary+zlib", BINARY, True)):
+        frames = [encode_msg(m, codec, compress) for m in msgs]
+        assert all(decode_payload(f[HEADER.size:]) == m for f, m in zip(frames, msgs))
+        size, seconds = measure(frames)
+        print(f"{name:>12}: {size:>10,} bytes, decode {seconds * 1000:.1f} ms")
@@ -0,0 +1,57 @@
+# bench_pow.py
+
+import hashlib
+import sys
+import time
+from blockchain import Block, Transaction
+from mining import MAX_TARGET, hashrate, search_nonces
+
+def legacy_search(block, count):
+    """
+    Test `count` nonces the way Block.mine() did before the midstate kernel:
+    rebuild the header string, hash it from scratch and compare hex prefixes.
+
+    Args:
+        block (Block): Block whose header is hashed.
+        count (int): Number of nonces to test.
+    """
+    prefix = '0' * 64
+    for nonce in range(count):
+        header = f'{block.index}{block.prev_hash}{block.merkle_root}{block.timestamp}{nonce}'
+        hashlib.sha256(header.encode()).hexdigest().startswith(prefix)
+
+def kernel_search(block, count):
+    """
+    Test `count` nonces with the midstate kernel at an unreachable target.
+
+    Args:
+        block (Block): Block whose header is hashed.
+        count (int): Number of nonces to test.
+    """
+    search_nonces(block.header_prefix(), 0, 0, count)
+
+def check_equivalence(block, count=1000):
+    """
+    Confirm the kernel produces the same hashes as Block.compute_hash().
+
+    Args:
+        block (Block): Block to check.
+        count (int): Number of nonces to compare.
+    """
+    prefix = block.header_prefix()
+    for nonce in range(count):
+        block.nonce = nonce
+        expected = block.compute_hash()
+        assert search_nonces(prefix, MAX_TARGET, nonce, 1) == (nonce, expected)
+    block.nonce = 0
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tx = Transaction("W001", "2025-05-02", "09:00", "17:00", "sigW", "sigS")
+    blk = Block(0, "0" * 64, [tx], 3)
+    check_equivalence(blk)
+
+    for name, fn in (("legacy", legacy_search), ("midstate", kernel_search)):
+        start = time.perf_counter()
+        fn(blk, n)
+        print(f"{name:>9}: {hashrate(n, time.perf_counter() - start)}")
@@ -0,0 +1,71 @@
+# bench_sigverify.py
+
+import sys
+import time
+from ecdsa import SigningKey
+import blockchain
+import sigverify
+from blockchain import Transaction, verify_transactions
+
+def make_transactions(n, workers=50):
+    """
+    Build `n` worker-signed transactions spread over `workers` worker keys and
+    register the public keys in blockchain.WORKER_KEYS.
+
+    Args:
+        n (int): Number of transactions.
+        workers (int, optional): Number of distinct workers. Defaults to 50.
+
+    Returns:
+        list: Transactions as dictionaries.
+    """
+    keys = {}
+    for w in range(workers):
+        wid = f"W{w:03d}"
+        keys[wid] = SigningKey.generate()
+        blockchain.WORKER_KEYS[wid] = keys[wid].get_verifying_key()
+    txs = []
+    for i in range(n):
+        wid = f"W{i % workers:03d}"
+        tx = Transaction(wid, f"2025-05-{i % 28 + 1:02d}", f"{i % 24:02d}:00", "17:00")
+        tx.sign_worker(keys[wid])
+        txs.append(tx.to_dict())
+    return txs
+
+def serial_verify(txs):
+    """
+    Verify each transaction one at a time the way verify_worker() did before
+    batching: re-encode the payload and run one ecdsa verify, with no cache.
+
+    Args:
+        txs (list): Transactions as dictionaries.
+
+    Returns:
+        list: One bool per transaction.
+    """
+    results = []
+    for d in txs:
+        tx = Transaction.from_dict(d)
+        vk = blockchain.WORKER_KEYS[tx.worker_id]
+        results.append(vk.verify(bytes.fromhex(tx.worker_signature), tx.worker_payload()))
+    return results
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    procs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"Signing {n} transactions...")
+    txs = make_transactions(n)
+
+    runs = (("serial", serial_verify),
+            ("batch", lambda t: verify_transactions(t, procs)),
+            ("cached", lambda t: verify_transactions(t, procs)))
+    for name, fn in runs:
+        start = time.perf_counter()
+        results = fn(txs)
+        elapsed = time.perf_counter() - start
+        assert all(results)
+        print(f"{name:>7}: {elapsed:.2f}s ({n / elapsed:,.0f} tx/s)")
+
+    txs[0]["shift_end"] = "23:59"
+    assert verify_transactions(txs[:1]) == [False]
+    print(f"cache entries: {len(sigverify.cache)}")
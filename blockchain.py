@@ -4,6 +4,9 @@ import hashlib
 import json
 from datetime import datetime
 from ecdsa import SigningKey
+from merkle import merkle_root, tx_hash
+from mining import BATCH_SIZE, difficulty_to_target, get_pool, search_nonces
+from sigverify import verify_batch, verify_signature
 
 WORKER_KEYS = {
     # "W001": VerifyingKey.from_pem(open("keys/W001_pub.pem").read())
@@ -52,24 +55,57 @@ class Transaction:
             "supervisor_signature": self.supervisor_signature
         }
 
-    def sign_worker(self, sk: SigningKey):
+    def txid(self):
         """
-        Sign the transaction using the worker's private key.
+        Return the transaction ID: the same hash used for its Merkle leaf.
 
-        Args:
-            sk (SigningKey): The signing key of the worker.
+        Returns:
+            str: SHA-256 hex digest of the transaction.
         """
-        payload = json.dumps({
+        return tx_hash(self.to_dict())
+
+    def worker_payload(self):
+        """
+        Return the bytes the worker signs: the shift details.
+
+        Returns:
+            bytes: Canonical JSON encoding of the shift fields.
+        """
+        return json.dumps({
             "worker_id": self.worker_id,
             "date": self.date,
             "shift_start": self.shift_start,
             "shift_end": self.shift_end
         }, sort_keys=True).encode()
-        self.worker_signature = sk.sign(payload).hex()
+
+    def supervisor_payload(self):
+        """
+        Return the bytes the supervisor signs: the shift details plus the worker's signature.
+
+        Returns:
+            bytes: Canonical JSON encoding of the shift fields and worker signature.
+        """
+        return json.dumps({
+            "worker_id": self.worker_id,
+            "date": self.date,
+            "shift_start": self.shift_start,
+            "shift_end": self.shift_end,
+            "worker_signature": self.worker_signature
+        }, sort_keys=True).encode()
+
+    def sign_worker(self, sk: SigningKey):
+        """
+        Sign the transaction using the worker's private key.
+
+        Args:
+            sk (SigningKey): The signing key of the worker.
+        """
+        self.worker_signature = sk.sign(self.worker_payload()).hex()
 
     def verify_worker(self):
         """
-        Verify the worker's signature.
+        Verify the worker's signature. Results are cached, so a signature checked
+        once is not verified again.
 
         Returns:
             bool: True if signature is valid, False otherwise.
@@ -80,13 +116,7 @@ class Transaction:
         vk = WORKER_KEYS.get(self.worker_id)
         if vk is None:
             raise ValueError(f"No public key for worker {self.worker_id}")
-        payload = json.dumps({
-            "worker_id": self.worker_id,
-            "date": self.date,
-            "shift_start": self.shift_start,
-            "shift_end": self.shift_end
-        }, sort_keys=True).encode()
-        return vk.verify(bytes.fromhex(self.worker_signature), payload)
+        return verify_signature(vk, self.worker_payload(), self.worker_signature)
 
     def sign_supervisor(self, sk: SigningKey):
         """
@@ -95,12 +125,12 @@ class Transaction:
         Args:
             sk (SigningKey): The signing key of the supervisor.
         """
-        payload = json.dumps(self.to_dict(), sort_keys=True).encode()
-        self.supervisor_signature = sk.sign(payload).hex()
+        self.supervisor_signature = sk.sign(self.supervisor_payload()).hex()
 
     def verify_supervisor(self):
         """
-        Verify the supervisor's signature.
+        Verify the supervisor's signature. Results are cached, so a signature checked
+        once is not verified again.
 
         Returns:
             bool: True if signature is valid, False otherwise.
@@ -111,20 +141,58 @@ class Transaction:
         vk = SUPERVISOR_KEYS.get(self.worker_id)
         if vk is None:
             raise ValueError(f"No public key for supervisor of {self.worker_id}")
-        payload = json.dumps({
-            "worker_id": self.worker_id,
-            "date": self.date,
-            "shift_start": self.shift_start,
-            "shift_end": self.shift_end,
-            "worker_signature": self.worker_signature
-        }, sort_keys=True).encode()
-        return vk.verify(bytes.fromhex(self.supervisor_signature), payload)
+        return verify_signature(vk, self.supervisor_payload(), self.supervisor_signature)
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Rebuild a transaction from its dictionary form.
+
+        Args:
+            d (dict): Dictionary produced by to_dict().
+
+        Returns:
+            Transaction: The transaction.
+        """
+        return cls(d["worker_id"], d["date"], d["shift_start"], d["shift_end"],
+                   d.get("worker_signature", ""), d.get("supervisor_signature", ""))
+
+def verify_transactions(txs, workers=None):
+    """
+    Verify the signatures of many transactions in one batch. Worker signatures are
+    always checked; supervisor signatures only once present. A missing public key
+    counts as a failure.
+
+    Args:
+        txs (list): Transactions as dictionaries.
+        workers (int, optional): Processes to verify with. Defaults to the CPU count.
+
+    Returns:
+        list: One bool per transaction, in order.
+    """
+    items, owners = [], []
+    ok = [True] * len(txs)
+    for i, d in enumerate(txs):
+        tx = Transaction.from_dict(d)
+        checks = [(WORKER_KEYS.get(tx.worker_id), tx.worker_payload, tx.worker_signature)]
+        if tx.supervisor_signature:
+            checks.append((SUPERVISOR_KEYS.get(tx.worker_id), tx.supervisor_payload,
+                           tx.supervisor_signature))
+        for vk, payload, sig in checks:
+            if vk is None:
+                ok[i] = False
+                continue
+            items.append((vk, payload(), sig))
+            owners.append(i)
+    for i, valid in zip(owners, verify_batch(items, workers)):
+        ok[i] = ok[i] and valid
+    return ok
 
 class Block:
     """
     Represents a block in the blockchain containing a list of transactions.
     """
-    def __init__(self, index, prev_hash, transactions, difficulty):
+    def __init__(self, index, prev_hash, transactions, difficulty, target=None):
         """
         Initialize a new Block.
 
@@ -132,13 +200,17 @@ class Block:
             index (int): The index of the block.
             prev_hash (str): Hash of the previous block.
             transactions (list): List of Transaction objects.
-            difficulty (int): Proof-of-work difficulty.
+            difficulty (int): Proof-of-work difficulty (leading hex zeros).
+            target (int, optional): Numeric proof-of-work target. When set, the hash must
+                be at most this value and the target is part of the hashed header.
+                Defaults to None, which uses `difficulty`.
         """
         self.index = index
         self.timestamp = datetime.utcnow().isoformat()
         self.prev_hash = prev_hash
         self.transactions = transactions
         self.difficulty = difficulty
+        self.target = target
         self.nonce = 0
         self.merkle_root = self.compute_merkle_root()
         self.hash = self.compute_hash()
@@ -150,18 +222,7 @@ class Block:
         Returns:
             str: The Merkle root hash.
         """
-        tx_hashes = [
-            hashlib.sha256(json.dumps(tx.to_dict(), sort_keys=True).encode()).hexdigest()
-            for tx in self.transactions
-        ]
-        while len(tx_hashes) > 1:
-            new_level = []
-            for i in range(0, len(tx_hashes), 2):
-                L = tx_hashes[i]
-                R = tx_hashes[i+1] if i+1 < len(tx_hashes) else L
-                new_level.append(hashlib.sha256((L+R).encode()).hexdigest())
-            tx_hashes = new_level
-        return tx_hashes[0] if tx_hashes else ''
+        return merkle_root([tx.to_dict() for tx in self.transactions])
 
     def compute_hash(self):
         """
@@ -170,17 +231,58 @@ class Block:
         Returns:
             str: The computed hash.
         """
-        header = f'{self.index}{self.prev_hash}{self.merkle_root}{self.timestamp}{self.nonce}'
+        header = f'{self.header_prefix()}{self.nonce}'
         return hashlib.sha256(header.encode()).hexdigest()
 
-    def mine(self):
+    def header_prefix(self):
+        """
+        Return the header fields that precede the nonce in the hashed header.
+
+        Returns:
+            str: The concatenated index, prev_hash, merkle_root and timestamp,
+                followed by the target in hex for numeric-target blocks.
+        """
+        prefix = f'{self.index}{self.prev_hash}{self.merkle_root}{self.timestamp}'
+        return prefix if self.target is None else f'{prefix}{self.target:064x}'
+
+    def pow_target(self):
+        """
+        Return the numeric target the block hash must meet.
+
+        Returns:
+            int: The explicit target, or the one equivalent to the difficulty.
+        """
+        return difficulty_to_target(self.difficulty) if self.target is None else self.target
+
+    def mine(self, workers=1, abort=None):
         """
-        Perform proof-of-work to find a valid nonce that meets the difficulty requirement.
+        Perform proof-of-work to find a valid nonce whose hash meets the block's target.
+
+        Args:
+            workers (int, optional): Number of processes to search with. Values above 1
+                split the nonce space across a shared MiningPool. Defaults to 1.
+            abort (threading.Event, optional): Checked between nonce batches; when set,
+                mining stops and the block is left unmined. Defaults to None.
+
+        Returns:
+            int or None: Number of hashes computed, or None if mining was aborted.
         """
-        prefix = '0' * self.difficulty
-        while not self.hash.startswith(prefix):
-            self.nonce += 1
-            self.hash = self.compute_hash()
+        prefix = self.header_prefix()
+        target = self.pow_target()
+        if workers > 1:
+            nonce, h, hashes = get_pool(workers).search(prefix, target, abort=abort)
+            if nonce is None:
+                return None
+            self.nonce, self.hash = nonce, h
+            return hashes
+        start = self.nonce
+        while abort is None or not abort.is_set():
+            hit = search_nonces(prefix, target, self.nonce, BATCH_SIZE)
+            if hit is not None:
+                self.nonce, self.hash = hit
+                return self.nonce - start + 1
+            self.nonce += BATCH_SIZE
+        return None
 
     def to_dict(self):
         """
@@ -189,7 +291,7 @@ class Block:
         Returns:
             dict: Dictionary representation of the block.
         """
-        return {
+        d = {
             "index": self.index,
             "timestamp": self.timestamp,
             "prev_hash": self.prev_hash,
@@ -199,3 +301,6 @@ class Block:
             "merkle_root": self.merkle_root,
             "hash": self.hash
         }
+        if self.target is not None:
+            d["target"] = f"{self.target:064x}"
+        return d
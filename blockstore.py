@@ -0,0 +1,371 @@
+# blockstore.py
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+RECORD = struct.Struct("<I")        # length prefix of each block record in blocks.dat
+HASH_ENTRY = struct.Struct("<32sQ") # one hash.idx slot: raw block hash, offset into blocks.dat
+INDEX_HEADER = struct.Struct("<8sQQ")   # magic, entries, bytes of blocks.dat indexed
+INDEX_MAGIC = b"HASHIDX2"
+EMPTY = bytes(32)                   # key of an unused hash.idx slot
+MIN_SLOTS = 1024                    # hash.idx slots in a new store
+SLOT = struct.Struct("<Q")          # one height.idx slot
+BLOCK_CACHE = 1024                  # block dicts BlockStore keeps in memory
+
+class BlockStore:
+    """
+    Durable on-disk block storage for one peer.
+
+    - blocks.dat: append-only segment of length-prefixed JSON block records
+    - hash.idx:   memory-mapped open-addressing hash table of (hash, offset)
+                  slots, probed in place; the first slot is a header with the
+                  entry count and how much of blocks.dat is indexed
+    - height.idx: memory-mapped array; slot 0 holds the active chain length and
+                  slot h+1 the offset of the active block at height h
+
+    No per-block state is kept in memory apart from a bounded cache of
+    recently read blocks, so opening a store costs the same however many
+    blocks it holds.
+    """
+    def __init__(self, path, cache_size=BLOCK_CACHE):
+        """
+        Open (or create) a block store directory and map its indexes.
+
+        Args:
+            path (str): Directory holding the store files.
+            cache_size (int, optional): Blocks kept in memory. Defaults to BLOCK_CACHE.
+        """
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._lock = threading.Lock()
+        self._data = open(os.path.join(path, "blocks.dat"), "a+b")
+        self._data_size = self._data.seek(0, os.SEEK_END)
+        self._cache = OrderedDict()     # offset -> block, least recently used first
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self._open_hash_index()
+
+        height_path = os.path.join(path, "height.idx")
+        self._height_file = open(height_path, "r+b" if os.path.exists(height_path) else "w+b")
+        self._heights = None
+        self._map_heights(1024)
+
+    def _open_hash_index(self):
+        """
+        Map hash.idx, creating it if it is missing or unreadable, then index
+        any records appended to blocks.dat after it was last updated.
+        """
+        path = os.path.join(self._path, "hash.idx")
+        index = None
+        if os.path.exists(path):
+            f = open(path, "r+b")
+            size = f.seek(0, os.SEEK_END)
+            slots = size // HASH_ENTRY.size - 1
+            if slots >= MIN_SLOTS and slots & (slots - 1) == 0:
+                mm = mmap.mmap(f.fileno(), 0)
+                if INDEX_HEADER.unpack_from(mm, 0)[0] == INDEX_MAGIC:
+                    index = (f, mm, slots)
+                else:
+                    mm.close()
+            if index is None:
+                f.close()
+        if index is None:
+            index = self._new_hash_index(MIN_SLOTS, path)
+        self._index = index
+        _, self._entries, indexed = INDEX_HEADER.unpack_from(index[1], 0)
+        self._index_records(min(indexed, self._data_size))
+
+    def _new_hash_index(self, slots, path):
+        """
+        Create an empty hash index file.
+
+        Args:
+            slots (int): Number of slots, a power of two.
+            path (str): File to create.
+
+        Returns:
+            tuple: (file, mmap, slots).
+        """
+        f = open(path, "w+b")
+        f.truncate((slots + 1) * HASH_ENTRY.size)
+        mm = mmap.mmap(f.fileno(), 0)
+        INDEX_HEADER.pack_into(mm, 0, INDEX_MAGIC, 0, 0)
+        return f, mm, slots
+
+    def _index_records(self, pos):
+        """
+        Index the records of blocks.dat from `pos` on. A torn record at the end,
+        left by a crash mid-append, is cut off.
+
+        Args:
+            pos (int): Offset of the first record not yet indexed.
+        """
+        fd = self._data.fileno()
+        while pos + RECORD.size <= self._data_size:
+            (size,) = RECORD.unpack(os.pread(fd, RECORD.size, pos))
+            end = pos + RECORD.size + size
+            if end > self._data_size:
+                break
+            block = json.loads(os.pread(fd, size, pos + RECORD.size))
+            self._insert(bytes.fromhex(block["hash"]), pos)
+            pos = end
+        if pos < self._data_size:
+            self._data.truncate(pos)
+            self._data_size = pos
+        self._set_indexed(pos)
+
+    def _slot(self, mm, slots, raw):
+        """
+        Find the slot holding a hash, or the empty slot where it would go.
+
+        Args:
+            mm (mmap): The hash index.
+            slots (int): Number of slots in it.
+            raw (bytes): The 32-byte block hash.
+
+        Returns:
+            tuple: (byte position of the slot, stored key, stored offset).
+        """
+        mask = slots - 1
+        i = int.from_bytes(raw[:8], "little") & mask
+        while True:
+            pos = (i + 1) * HASH_ENTRY.size
+            key, offset = HASH_ENTRY.unpack_from(mm, pos)
+            if key == raw or key == EMPTY:
+                return pos, key, offset
+            i = (i + 1) & mask
+
+    def _insert(self, raw, offset):
+        """
+        Add or update a hash index entry, doubling the table when it is half full.
+        Call with the lock held, or before the store is shared.
+
+        Args:
+            raw (bytes): The 32-byte block hash.
+            offset (int): Offset of the block record.
+        """
+        _, mm, slots = self._index
+        pos, key, _ = self._slot(mm, slots, raw)
+        HASH_ENTRY.pack_into(mm, pos, raw, offset)
+        if key == EMPTY:
+            self._entries += 1
+            if self._entries * 2 > slots:
+                self._grow(slots * 2)
+
+    def _grow(self, slots):
+        """
+        Rehash every entry into a new table and swap it in. Readers still probing
+        the old table keep their mapping until they are done with it.
+
+        Args:
+            slots (int): Number of slots in the new table.
+        """
+        _, old, old_slots = self._index
+        path = os.path.join(self._path, "hash.idx")
+        f, mm, _ = self._new_hash_index(slots, path + ".tmp")
+        for i in range(old_slots):
+            key, offset = HASH_ENTRY.unpack_from(old, (i + 1) * HASH_ENTRY.size)
+            if key != EMPTY:
+                pos, _, _ = self._slot(mm, slots, key)
+                HASH_ENTRY.pack_into(mm, pos, key, offset)
+        _, _, indexed = INDEX_HEADER.unpack_from(old, 0)
+        INDEX_HEADER.pack_into(mm, 0, INDEX_MAGIC, self._entries, indexed)
+        mm.flush()
+        os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._index = (f, mm, slots)
+
+    def _set_indexed(self, size):
+        """
+        Record in the hash index header how much of blocks.dat it covers.
+
+        Args:
+            size (int): Bytes of blocks.dat indexed.
+        """
+        INDEX_HEADER.pack_into(self._index[1], 0, INDEX_MAGIC, self._entries, size)
+
+    def _map_heights(self, slots):
+        """
+        Map height.idx with room for at least `slots` slots, growing the file if needed.
+
+        Args:
+            slots (int): Minimum number of slots required.
+        """
+        size = self._height_file.seek(0, os.SEEK_END)
+        needed = slots * SLOT.size
+        if self._heights is not None and size >= needed:
+            return
+        if size < needed:
+            if self._heights is not None:
+                self._heights.close()
+            self._height_file.truncate(max(needed, size * 2))
+        self._heights = mmap.mmap(self._height_file.fileno(), 0)
+
+    def __contains__(self, h):
+        return self.offset_of(h) is not None
+
+    def __len__(self):
+        return self._entries
+
+    def offset_of(self, h):
+        """
+        Look up where a block is stored by probing the mapped hash index.
+
+        Args:
+            h (str): Block hash.
+
+        Returns:
+            int or None: Offset of its record in blocks.dat, or None if it is not stored.
+        """
+        try:
+            raw = bytes.fromhex(h)
+        except (TypeError, ValueError):
+            return None
+        if len(raw) != 32 or raw == EMPTY:
+            return None
+        _, mm, slots = self._index
+        _, key, offset = self._slot(mm, slots, raw)
+        return offset if key == raw else None
+
+    def put(self, block):
+        """
+        Append a block to the segment file and index it by hash. Blocks already
+        stored are ignored.
+
+        Args:
+            block (dict): The block, including its cached "cum_work" and "height".
+        """
+        h = block["hash"]
+        with self._lock:
+            if h in self:
+                return
+            payload = json.dumps(block).encode()
+            offset = self._data_size
+            self._data.write(RECORD.pack(len(payload)) + payload)
+            self._data.flush()
+            os.fsync(self._data.fileno())
+            self._data_size += RECORD.size + len(payload)
+            self._insert(bytes.fromhex(h), offset)
+            self._set_indexed(self._data_size)
+        self._remember(offset, block)
+
+    def get(self, h):
+        """
+        Read a block by hash.
+
+        Args:
+            h (str): Block hash.
+
+        Returns:
+            dict or None: The block, or None if it is not stored.
+        """
+        offset = self.offset_of(h)
+        return None if offset is None else self.read(offset)
+
+    def read(self, offset):
+        """
+        Read the block stored at an offset, from the cache if it was used recently.
+
+        Args:
+            offset (int): Offset of the block record in blocks.dat.
+
+        Returns:
+            dict: The block.
+        """
+        with self._cache_lock:
+            block = self._cache.get(offset)
+            if block is not None:
+                self._cache.move_to_end(offset)
+                return block
+        fd = self._data.fileno()
+        (size,) = RECORD.unpack(os.pread(fd, RECORD.size, offset))
+        block = json.loads(os.pread(fd, size, offset + RECORD.size))
+        self._remember(offset, block)
+        return block
+
+    def _remember(self, offset, block):
+        with self._cache_lock:
+            self._cache[offset] = block
+            self._cache.move_to_end(offset)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def set_active(self, fork_height, connected):
+        """
+        Record a change of the active chain: everything above `fork_height` is
+        replaced by `connected`.
+
+        Args:
+            fork_height (int): Height of the last block kept (-1 to replace everything).
+            connected (list): Newly active blocks in height order.
+        """
+        with self._lock:
+            length = fork_height + 1 + len(connected)
+            self._map_heights(length + 1)
+            for b in connected:
+                SLOT.pack_into(self._heights, (b["height"] + 1) * SLOT.size,
+                               self.offset_of(b["hash"]))
+            SLOT.pack_into(self._heights, 0, length)
+            self._heights.flush()
+
+    def active_offsets(self):
+        """
+        Copy the active chain recorded in height.idx, as record offsets. The
+        blocks themselves are not read.
+
+        Returns:
+            array: Offsets of the active blocks from height 0 to the stored tip.
+        """
+        (length,) = SLOT.unpack_from(self._heights, 0)
+        offsets = array("Q")
+        offsets.frombytes(self._heights[SLOT.size:(length + 1) * SLOT.size])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        return offsets
+
+class BlockMap:
+    """
+    A dict-like view of every known block backed by a BlockStore. Lookups
+    probe the store's mapped hash index and read through its block cache.
+    """
+    def __init__(self, store):
+        """
+        Args:
+            store (BlockStore): The backing store.
+        """
+        self.store = store
+
+    def __contains__(self, h):
+        return h in self.store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, h):
+        block = self.get(h)
+        if block is None:
+            raise KeyError(h)
+        return block
+
+    def __setitem__(self, h, block):
+        self.store.put(block)
+
+    def get(self, h, default=None):
+        """
+        Look up a block.
+
+        Args:
+            h (str): Block hash.
+            default: Value returned if the block is unknown.
+
+        Returns:
+            dict: The block, or `default`.
+        """
+        block = self.store.get(h)
+        return default if block is None else block
@@ -0,0 +1,116 @@
+# chain_index.py
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from merkle import tx_hash
+
+class ChainIndex:
+    """
+    Secondary indexes over the active chain, updated block by block as
+    resolve_chain() connects and disconnects blocks.
+
+    - heights:    block hash -> height
+    - txids:      transaction ID -> (height, tx_index)
+    - by_worker:  worker_id -> sorted [(date, shift_start, height, tx_index), ...]
+    """
+    def __init__(self):
+        """
+        Create empty indexes.
+        """
+        self.heights = {}
+        self.txids = {}
+        self.by_worker = {}
+        self._lock = threading.Lock()
+
+    def connect(self, blocks):
+        """
+        Index blocks added to the tip of the active chain.
+
+        Args:
+            blocks (list): Blocks in height order, each with its "height".
+        """
+        with self._lock:
+            for b in blocks:
+                h = b["height"]
+                self.heights[b["hash"]] = h
+                for i, tx in enumerate(b["transactions"]):
+                    self.txids[tx_hash(tx)] = (h, i)
+                    insort(self.by_worker.setdefault(tx["worker_id"], []),
+                           (tx["date"], tx["shift_start"], h, i))
+
+    def disconnect(self, blocks):
+        """
+        Remove blocks rolled back from the active chain.
+
+        Args:
+            blocks (list): Blocks in height order, each with its "height".
+        """
+        with self._lock:
+            for b in reversed(blocks):
+                h = b["height"]
+                if self.heights.get(b["hash"]) == h:
+                    del self.heights[b["hash"]]
+                for i, tx in enumerate(b["transactions"]):
+                    txid = tx_hash(tx)
+                    if self.txids.get(txid) == (h, i):
+                        del self.txids[txid]
+                    shifts = self.by_worker.get(tx["worker_id"], [])
+                    key = (tx["date"], tx["shift_start"], h, i)
+                    pos = bisect_left(shifts, key)
+                    if pos < len(shifts) and shifts[pos] == key:
+                        del shifts[pos]
+                        if not shifts:
+                            del self.by_worker[tx["worker_id"]]
+
+    def apply_reorg(self, connected, disconnected=()):
+        """
+        Update the indexes after the active chain changes.
+
+        Args:
+            connected (list): Blocks added to the active chain.
+            disconnected (list, optional): Blocks removed from the active chain. Defaults to ().
+        """
+        self.disconnect(disconnected)
+        self.connect(connected)
+
+    def height_of(self, block_hash):
+        """
+        Look up the height of an active-chain block.
+
+        Args:
+            block_hash (str): Block hash.
+
+        Returns:
+            int or None: The height, or None if the block is not on the active chain.
+        """
+        return self.heights.get(block_hash)
+
+    def locate(self, txid):
+        """
+        Look up where a transaction is confirmed on the active chain.
+
+        Args:
+            txid (str): Transaction ID.
+
+        Returns:
+            tuple or None: (height, tx_index), or None if not confirmed.
+        """
+        return self.txids.get(txid)
+
+    def shifts(self, worker_id, start=None, end=None):
+        """
+        Find a worker's shifts in a date range, in date and start-time order.
+
+        Args:
+            worker_id (str): Worker ID.
+            start (str, optional): First date included. Defaults to the earliest.
+            end (str, optional): Last date included. Defaults to the latest.
+
+        Returns:
+            list: (height, tx_index) locations.
+        """
+        with self._lock:
+            shifts = self.by_worker.get(worker_id, [])
+            lo = bisect_left(shifts, (start,)) if start is not None else 0
+            hi = bisect_right(shifts, (end + "\uffff",)) if end is not None else len(shifts)
+            return [(h, i) for _, _, h, i in shifts[lo:hi]]
@@ -0,0 +1,136 @@
+# chainstate.py
+
+import threading
+
+class ChainView:
+    """
+    An immutable, read-only sequence of active-chain blocks, as published.
+
+    Views share the writer's list instead of copying it. The writer only ever
+    appends to that list; a reorg starts a new one, so the blocks a view covers
+    never change underneath it. Slicing returns another view without copying.
+    When the chain is backed by a BlockStore the list holds record offsets and
+    blocks are read through the store's cache as they are accessed.
+    """
+    def __init__(self, blocks, start, stop, load=None):
+        """
+        Args:
+            blocks (list): The writer's list of blocks (or record offsets), by height.
+            start (int): First height covered.
+            stop (int): Height after the last one covered.
+            load (callable, optional): Turns a list entry into its block. Defaults
+                to None, for a list of blocks.
+        """
+        self._blocks = blocks
+        self._start = start
+        self._stop = stop
+        self._load = load
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, i):
+        n = self._stop - self._start
+        if isinstance(i, slice):
+            start, stop, step = i.indices(n)
+            if step != 1:
+                return [self[k] for k in range(start, stop, step)]
+            return ChainView(self._blocks, self._start + start, self._start + max(start, stop),
+                             self._load)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("chain index out of range")
+        entry = self._blocks[self._start + i]
+        return entry if self._load is None else self._load(entry)
+
+    def __iter__(self):
+        for i in range(self._start, self._stop):
+            entry = self._blocks[i]
+            yield entry if self._load is None else self._load(entry)
+
+class ChainState:
+    """
+    The active chain with a single writer lock and snapshots that cost O(1) to publish.
+
+    Writers (block acceptance, reorgs, sync) hold `lock` while they change the
+    chain through switch(), which publishes the result. Readers call
+    snapshot() and get an immutable ChainView of the chain as of the last
+    publish, without taking the lock, so they never wait for block acceptance
+    and never see half of a reorg. Extending the chain never copies it; only a
+    reorg copies the list of blocks below the fork. Blocks are never edited
+    once stored.
+    """
+    def __init__(self, chain=None):
+        """
+        Wrap an active chain.
+
+        Args:
+            chain (list, optional): Blocks in height order. Defaults to an empty chain.
+        """
+        self.lock = threading.RLock()
+        self._blocks = list(chain or [])
+        self._store = None
+        self._view = ChainView(self._blocks, 0, len(self._blocks))
+
+    def __len__(self):
+        return len(self._view)
+
+    def snapshot(self):
+        """
+        Return the active chain as of the last publish.
+
+        Returns:
+            ChainView: Blocks in height order. Treat them as read-only.
+        """
+        return self._view
+
+    def tip(self):
+        """
+        Return the tip of the last published chain.
+
+        Returns:
+            dict or None: The tip block, or None if the chain is empty.
+        """
+        chain = self._view
+        return chain[-1] if chain else None
+
+    def use_store(self, store):
+        """
+        Back the chain by a BlockStore: load the active chain recorded there and
+        keep only the record offsets of active blocks in memory.
+
+        Args:
+            store (BlockStore): The store, with every block of the chain already in it.
+        """
+        with self.lock:
+            self._store = store
+            self._blocks = store.active_offsets()
+            self._publish()
+
+    def switch(self, fork_height, branch):
+        """
+        Replace every block above `fork_height` with `branch` and publish the
+        result. Views already handed out keep the blocks they were given.
+
+        Args:
+            fork_height (int): Height of the last block kept (-1 to replace everything).
+            branch (list): New blocks in height order, starting at fork_height + 1.
+
+        Returns:
+            list: The blocks that were rolled back.
+        """
+        with self.lock:
+            disconnected = list(self._view[fork_height+1:])
+            if disconnected:
+                self._blocks = self._blocks[:fork_height+1]
+            if self._store is None:
+                self._blocks.extend(branch)
+            else:
+                self._blocks.extend(self._store.offset_of(b["hash"]) for b in branch)
+            self._publish()
+            return disconnected
+
+    def _publish(self):
+        load = self._store.read if self._store is not None else None
+        self._view = ChainView(self._blocks, 0, len(self._blocks), load)
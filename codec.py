@@ -0,0 +1,291 @@
+# codec.py
+
+import json
+import struct
+import zlib
+
+MAGIC        = 0xBC     # first payload byte of a binary frame (JSON frames start with '{')
+VERSION      = 2        # binary format version (2: cum_work and target block fields)
+FLAG_ZLIB    = 0x01     # body is zlib-compressed
+COMPRESS_MIN = 512      # smallest body worth compressing
+MAX_INFLATED = 64 * 1024 * 1024     # largest body a compressed frame may expand to
+PREAMBLE = struct.Struct("!BBBB")   # magic, version, flags, message type
+LENGTH   = struct.Struct("!H")      # length prefix of strings and byte fields
+TX_HEAD  = struct.Struct("!HHHHBHBH")   # four text lengths, then (tag, length) per signature
+
+# Hex-string field tags
+HEX32 = 0               # 32 raw bytes (hashes)
+HEX   = 1               # length-prefixed raw bytes (signatures)
+TEXT  = 2               # length-prefixed UTF-8 (anything that is not lowercase hex)
+
+BLOCK_FIELDS = ("index", "timestamp", "prev_hash", "difficulty", "nonce", "merkle_root", "hash")
+BLOCK_OPTIONAL = ("transactions", "cum_work", "height", "target")
+TX_FIELDS = ("worker_id", "date", "shift_start", "shift_end",
+             "worker_signature", "supervisor_signature")
+MESSAGES = {"NEW_BLOCK": 1, "BLOCK": 2, "HEADERS": 3}
+
+class _Writer:
+    """
+    Append-only buffer with the field encoders of the binary format.
+    """
+    def __init__(self):
+        self.buf = bytearray()
+
+    def uint(self, n):
+        if type(n) is not int or n < 0:
+            raise ValueError(f"cannot encode {n!r} as an unsigned integer")
+        raw = n.to_bytes((n.bit_length() + 7) // 8, "big")
+        if len(raw) > 255:
+            raise ValueError("integer too large")
+        self.buf.append(len(raw))
+        self.buf += raw
+
+    def raw(self, data):
+        if len(data) > 0xFFFF:
+            raise ValueError("field too long")
+        self.buf += LENGTH.pack(len(data))
+        self.buf += data
+
+    def text(self, s):
+        if not isinstance(s, str):
+            raise ValueError(f"cannot encode {s!r} as a string")
+        self.raw(s.encode())
+
+    def hex(self, s):
+        if not isinstance(s, str):
+            raise ValueError(f"cannot encode {s!r} as a string")
+        try:
+            data = bytes.fromhex(s)
+        except ValueError:
+            data = None
+        if data is None or data.hex() != s:
+            self.buf.append(TEXT)
+            self.text(s)
+        elif len(data) == 32:
+            self.buf.append(HEX32)
+            self.buf += data
+        else:
+            self.buf.append(HEX)
+            self.raw(data)
+
+class _Reader:
+    """
+    Cursor over a binary body with the matching field decoders.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, n):
+        pos = self.pos
+        if pos + n > len(self.data):
+            raise ValueError("truncated binary frame")
+        self.pos = pos + n
+        return self.data[pos:pos + n]
+
+    def byte(self):
+        return self.take(1)[0]
+
+    def uint(self):
+        return int.from_bytes(self.take(self.byte()), "big")
+
+    def raw(self):
+        return self.take(LENGTH.unpack_from(self.take(2))[0])
+
+    def text(self):
+        return self.raw().decode()
+
+    def hex(self):
+        tag = self.byte()
+        if tag == HEX32:
+            return self.take(32).hex()
+        if tag == HEX:
+            return self.raw().hex()
+        if tag == TEXT:
+            return self.text()
+        raise ValueError(f"unknown field tag {tag}")
+
+def _sig_field(s):
+    """
+    Split a signature into its field tag and stored bytes.
+
+    Args:
+        s (str): The signature as stored in the transaction.
+
+    Returns:
+        tuple: (HEX or TEXT, bytes).
+    """
+    try:
+        data = bytes.fromhex(s)
+        if data.hex() == s:
+            return HEX, data
+    except ValueError:
+        pass
+    return TEXT, s.encode()
+
+def _put_tx(w, tx):
+    if len(tx) != len(TX_FIELDS) or any(k not in tx for k in TX_FIELDS) \
+       or not all(isinstance(tx[k], str) for k in TX_FIELDS):
+        raise ValueError("transaction has non-canonical fields")
+    texts = [tx[k].encode() for k in TX_FIELDS[:4]]
+    wtag, wsig = _sig_field(tx["worker_signature"])
+    stag, ssig = _sig_field(tx["supervisor_signature"])
+    fields = texts + [wsig, ssig]
+    if max(len(f) for f in fields) > 0xFFFF:
+        raise ValueError("field too long")
+    w.buf += TX_HEAD.pack(*(len(t) for t in texts), wtag, len(wsig), stag, len(ssig))
+    for f in fields:
+        w.buf += f
+
+def _get_tx(r):
+    data, pos = r.data, r.pos
+    if pos + TX_HEAD.size > len(data):
+        raise ValueError("truncated binary frame")
+    a, b, c, d, wtag, wlen, stag, slen = TX_HEAD.unpack_from(data, pos)
+    pos += TX_HEAD.size
+    end = pos + a + b + c + d + wlen + slen
+    if end > len(data):
+        raise ValueError("truncated binary frame")
+    worker_id = data[pos:pos + a].decode(); pos += a
+    date = data[pos:pos + b].decode(); pos += b
+    start = data[pos:pos + c].decode(); pos += c
+    finish = data[pos:pos + d].decode(); pos += d
+    wsig = data[pos:pos + wlen]; pos += wlen
+    ssig = data[pos:end]
+    r.pos = end
+    return {"worker_id": worker_id, "date": date, "shift_start": start, "shift_end": finish,
+            "worker_signature": wsig.hex() if wtag == HEX else wsig.decode(),
+            "supervisor_signature": ssig.hex() if stag == HEX else ssig.decode()}
+
+def _put_block(w, block):
+    if any(k not in block for k in BLOCK_FIELDS) \
+       or len(block) != len(BLOCK_FIELDS) + sum(k in block for k in BLOCK_OPTIONAL):
+        raise ValueError("block has non-canonical fields")
+    w.uint(block["index"])
+    w.text(block["timestamp"])
+    w.hex(block["prev_hash"])
+    w.uint(block["difficulty"])
+    w.uint(block["nonce"])
+    w.hex(block["merkle_root"])
+    w.hex(block["hash"])
+    present = [k for k in BLOCK_OPTIONAL if k in block]
+    w.buf.append(sum(1 << BLOCK_OPTIONAL.index(k) for k in present))
+    if "transactions" in block:
+        w.uint(len(block["transactions"]))
+        for tx in block["transactions"]:
+            _put_tx(w, tx)
+    for k in present:
+        if k == "target":
+            w.hex(block[k])
+        elif k != "transactions":
+            w.uint(block[k])
+
+def _get_block(r):
+    block = {"index": r.uint(), "timestamp": r.text(), "prev_hash": r.hex(),
+             "difficulty": r.uint(), "nonce": r.uint(), "merkle_root": r.hex(),
+             "hash": r.hex()}
+    flags = r.byte()
+    if flags & 1:
+        block["transactions"] = [_get_tx(r) for _ in range(r.uint())]
+    for bit, k in enumerate(BLOCK_OPTIONAL[1:], 1):
+        if flags & (1 << bit):
+            block[k] = r.hex() if k == "target" else r.uint()
+    return block
+
+def encode_binary(msg, compress=False):
+    """
+    Encode a block-carrying message in the binary format.
+
+    Args:
+        msg (dict): A NEW_BLOCK, BLOCK or HEADERS message.
+        compress (bool, optional): zlib-compress bodies of COMPRESS_MIN bytes or more.
+            Defaults to False.
+
+    Returns:
+        bytes: The payload.
+
+    Raises:
+        ValueError: If the message has no binary form (unknown type, extra fields or
+            values the format cannot represent exactly); send it as JSON instead.
+    """
+    kind = msg.get("type")
+    if kind not in MESSAGES:
+        raise ValueError(f"no binary encoding for {kind}")
+    w = _Writer()
+    if kind == "HEADERS":
+        if set(msg) != {"type", "headers", "done"}:
+            raise ValueError("HEADERS has non-canonical fields")
+        w.uint(len(msg["headers"]))
+        for hd in msg["headers"]:
+            _put_block(w, hd)
+        w.buf.append(1 if msg["done"] else 0)
+    else:
+        allowed = {"type", "block", "port"} if kind == "NEW_BLOCK" else {"type", "block"}
+        if not set(msg) <= allowed or "block" not in msg:
+            raise ValueError(f"{kind} has non-canonical fields")
+        _put_block(w, msg["block"])
+        if kind == "NEW_BLOCK":
+            port = msg.get("port")
+            w.buf.append(0 if port is None else 1)
+            if port is not None:
+                w.uint(port)
+    body, flags = bytes(w.buf), 0
+    if compress and len(body) >= COMPRESS_MIN:
+        body, flags = zlib.compress(body), FLAG_ZLIB
+    return PREAMBLE.pack(MAGIC, VERSION, flags, MESSAGES[kind]) + body
+
+def decode_binary(payload):
+    """
+    Decode a binary payload produced by encode_binary().
+
+    Args:
+        payload (bytes): The payload.
+
+    Returns:
+        dict: The message.
+
+    Raises:
+        ValueError: If the payload is malformed or uses an unsupported version.
+    """
+    if len(payload) < PREAMBLE.size:
+        raise ValueError("truncated binary frame")
+    magic, version, flags, code = PREAMBLE.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"unsupported binary frame version {version}")
+    body = payload[PREAMBLE.size:]
+    if flags & FLAG_ZLIB:
+        inflater = zlib.decompressobj()
+        try:
+            body = inflater.decompress(body, MAX_INFLATED)
+        except zlib.error as e:
+            raise ValueError(f"corrupt compressed frame: {e}")
+        if inflater.unconsumed_tail:
+            raise ValueError("compressed frame expands past the size limit")
+    r = _Reader(body)
+    if code == MESSAGES["HEADERS"]:
+        msg = {"type": "HEADERS", "headers": [_get_block(r) for _ in range(r.uint())],
+               "done": bool(r.byte())}
+    elif code in (MESSAGES["NEW_BLOCK"], MESSAGES["BLOCK"]):
+        kind = "NEW_BLOCK" if code == MESSAGES["NEW_BLOCK"] else "BLOCK"
+        msg = {"type": kind, "block": _get_block(r)}
+        if kind == "NEW_BLOCK" and r.byte():
+            msg["port"] = r.uint()
+    else:
+        raise ValueError(f"unknown binary message type {code}")
+    if r.pos != len(body):
+        raise ValueError("trailing bytes in binary frame")
+    return msg
+
+def decode_payload(payload):
+    """
+    Decode a frame payload in either format, detected from its first byte.
+
+    Args:
+        payload (bytes): The payload.
+
+    Returns:
+        dict: The message.
+    """
+    if payload[:1] == bytes([MAGIC]):
+        return decode_binary(payload)
+    return json.loads(payload.decode())
@@ -1,19 +1,74 @@
 # demo_api.py
 
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from peer import run_peer, mempool, peer_state, mine_block, broadcast_to_peers
-from blockchain import Transaction
-import threading, sys, csv, ssl, copy
-from io import StringIO
+from peer import run_peer, mempool, chain_state, chain_index, chain_listeners, chain_ready, approvals, broadcast_to_peers, get_block, block_header, tx_status, record_decision, VERIFY_SIGNATURES
+from anomalies import OverlapDetector
+from blockchain import Transaction, verify_transactions
+from merkle import MerkleTree
+import threading, sys, csv, ssl, copy, io, itertools, json, queue, zlib
+from datetime import datetime
 
 app = Flask(__name__)
 CORS(app)
 
+overlaps = OverlapDetector()
+chain_listeners.append(overlaps.apply_reorg)
+
+MAX_PAGE         = 1000     # blocks per /chain page
+STREAM_QUEUE     = 256      # events buffered per /chain/stream client before it is dropped
+STREAM_HEARTBEAT = 15       # seconds between keepalive comments on an idle stream
+chain_version = 0           # bumped on every chain change or approval; part of the /chain ETag
+subscribers   = []          # event queues of connected /chain/stream clients
+subscribers_lock = threading.Lock()
+
+def publish(event, data):
+    """
+    Push an event to every /chain/stream client and bump the chain version.
+    Clients that have fallen STREAM_QUEUE events behind are disconnected and
+    resynchronise when they reconnect.
+
+    Args:
+        event (str): Event name ('block', 'reorg' or 'update').
+        data (dict): Event payload.
+    """
+    global chain_version
+    with subscribers_lock:
+        chain_version += 1
+        if not subscribers:
+            return
+        msg = f"id: {chain_version}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        for q in list(subscribers):
+            try:
+                q.put_nowait(msg)
+            except queue.Full:
+                subscribers.remove(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(None)
+
+def publish_chain_change(connected, disconnected):
+    """
+    Chain listener: announce a reorg (if any) and then each newly connected block.
+
+    Args:
+        connected (list): Blocks added to the active chain.
+        disconnected (list): Blocks removed from the active chain.
+    """
+    if disconnected:
+        publish('reorg', {'fork_height':disconnected[0]['height']-1,
+                          'disconnected':[b['hash'] for b in disconnected]})
+    for b in connected:
+        publish('block', approvals.apply(b))
+
+chain_listeners.append(publish_chain_change)
+
 USERS = {
     'worker1': ('pass1', 'worker'),
     'manager1': ('pass2', 'manager')
 }
+BULK_FIELDS   = ['worker_id','date','shift_start','shift_end','worker_signature']
+MAX_BULK_ROWS = 10000   # rows accepted in one /submit/bulk body
 
 def authenticate(data):
     """
@@ -33,10 +88,11 @@ def authenticate(data):
 @app.route('/submit', methods=['POST'])
 def submit_shift():
     """
-    Submit a shift transaction to the blockchain.
+    Submit a shift transaction to the blockchain. The shift is queued in the
+    mempool and mined in the next block; poll /status/<txid> to follow it.
 
     Returns:
-        Response: JSON indicating success or failure.
+        Response: JSON with the transaction ID, or an error.
     """
     data = request.get_json() or {}
     if authenticate(data) != 'worker':
@@ -51,19 +107,286 @@ def submit_shift():
         data['shift_start'], data['shift_end'],
         data['worker_signature'], ''
     )
-    mempool.append(tx)
-    mine_block()
-    return jsonify({'status':'queued & mined'}),200
+    if VERIFY_SIGNATURES:
+        # Checked once here; the cached result is reused when the block is validated.
+        try:
+            if not tx.verify_worker():
+                return jsonify({'error':'Invalid worker signature'}),400
+        except ValueError as e:
+            return jsonify({'error':str(e)}),400
+    txid = tx.txid()
+    if tx_status(txid) is not None or not mempool.add(tx):
+        return jsonify({'error':'Duplicate shift','txid':txid}),409
+    return jsonify({'status':'pending','txid':txid}),202
+
+def bulk_rows(stream, fmt):
+    """
+    Parse a bulk upload one row at a time without buffering the whole body.
+
+    Args:
+        stream (file): Binary request body.
+        fmt (str): 'csv' (header row naming the columns) or 'ndjson' (one JSON object per line).
+
+    Yields:
+        dict or str: Each row as a dict, or an error message for a row that cannot be parsed.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='' if fmt=='csv' else None)
+    if fmt == 'csv':
+        for row in csv.DictReader(text):
+            yield row
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield f'Invalid JSON: {e}'
+            continue
+        yield row if isinstance(row, dict) else 'Row is not an object'
+
+def check_row(row, username, role):
+    """
+    Validate one bulk row.
+
+    Args:
+        row (dict): Parsed row.
+        username (str): Authenticated uploader.
+        role (str): Uploader role; workers may only upload their own shifts.
+
+    Returns:
+        str or None: An error message, or None if the row is valid.
+    """
+    missing = [k for k in BULK_FIELDS if not isinstance(row.get(k), str) or not row[k]]
+    if missing:
+        return f'Missing: {missing}'
+    if role == 'worker' and row['worker_id'] != username:
+        return 'Workers may only submit their own shifts'
+    try:
+        datetime.strptime(row['date'], '%Y-%m-%d')
+        if datetime.strptime(row['shift_start'], '%H:%M') >= datetime.strptime(row['shift_end'], '%H:%M'):
+            return 'shift_end must be after shift_start'
+    except ValueError as e:
+        return str(e)
+    return None
+
+@app.route('/submit/bulk', methods=['POST'])
+def submit_bulk():
+    """
+    Submit many shifts in one request. The body is CSV (Content-Type text/csv) or
+    NDJSON (anything else) with the columns in BULK_FIELDS, and the uploader
+    authenticates once with HTTP Basic auth. Rows are parsed as a stream,
+    validated, and the accepted shifts are added to the mempool together.
+
+    Returns:
+        Response: JSON with accepted/rejected counts and a result per row
+            (the transaction ID, or the reason it was rejected).
+    """
+    auth = request.authorization
+    role = auth and authenticate({'username':auth.username,'password':auth.password})
+    if role not in ('worker','manager'):
+        return jsonify({'error':'Unauthorized'}),403
+    fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+
+    results, txs, seen = [], [], set()
+    for n, row in enumerate(bulk_rows(request.stream, fmt), 1):
+        if n > MAX_BULK_ROWS:
+            return jsonify({'error':f'More than {MAX_BULK_ROWS} rows'}),413
+        err = row if isinstance(row, str) else check_row(row, auth.username, role)
+        if err is None:
+            tx = Transaction(row['worker_id'], row['date'], row['shift_start'],
+                             row['shift_end'], row['worker_signature'], '')
+            txid = tx.txid()
+            if txid in seen or tx_status(txid) is not None:
+                err = 'Duplicate shift'
+            else:
+                seen.add(txid)
+                results.append({'row':n,'txid':txid})
+                txs.append(tx)
+                continue
+        results.append({'row':n,'error':err})
+
+    accepted = [r for r in results if 'txid' in r]
+    if VERIFY_SIGNATURES and txs:
+        for r, ok in zip(accepted, verify_transactions([tx.to_dict() for tx in txs])):
+            if not ok:
+                r['error'] = 'Invalid worker signature'
+        txs = [tx for r, tx in zip(accepted, txs) if 'error' not in r]
+        accepted = [r for r in accepted if 'error' not in r]
+    for r, added in zip(accepted, mempool.add_many(txs)):
+        if added:
+            r['status'] = 'pending'
+        else:
+            r['error'] = 'Duplicate shift'
+    ok = sum(1 for r in results if 'error' not in r)
+    return jsonify({'accepted':ok,'rejected':len(results)-ok,'results':results}),200
+
+@app.route('/status/<txid>', methods=['GET'])
+def shift_status(txid):
+    """
+    Report whether a submitted shift is pending or confirmed, and how deeply.
+
+    Args:
+        txid (str): Transaction ID returned by /submit.
+
+    Returns:
+        Response: JSON status ("pending", or "confirmed" with block index and
+            confirmations), or 404 if the shift is unknown.
+    """
+    status = tx_status(txid)
+    if status is None:
+        return jsonify({'error':'Unknown transaction','txid':txid}),404
+    return jsonify(dict(status, txid=txid)),200
 
 @app.route('/chain', methods=['GET'])
 def view_chain():
     """
-    View the current blockchain.
+    View the blockchain, or one page of it.
+
+    Query parameters: from (first height, default 0), limit (blocks per page,
+    at most MAX_PAGE; default the whole chain) and headers=1 to leave out the
+    transactions. Responses carry an ETag built from the tip hash and chain
+    version, so a client sending it back in If-None-Match gets 304 until the
+    chain changes.
+
+    Returns:
+        Response: JSON list of blocks. X-Chain-Height gives the chain length and,
+            when more blocks follow, X-Next-From the height of the next page.
+    """
+    chain = chain_state.snapshot()
+    etag = f"{chain[-1]['hash'] if chain else 'empty'}-{chain_version}"
+    if request.if_none_match.contains(etag):
+        out = Response(status=304); out.set_etag(etag)
+        return out
+    try:
+        start = max(int(request.args.get('from', 0)), 0)
+        limit = request.args.get('limit')
+        end = start + min(max(int(limit), 1), MAX_PAGE) if limit else len(chain)
+    except ValueError:
+        return jsonify({'error':'from and limit must be integers'}),400
+    page = chain[start:end]
+    if request.args.get('headers') in ('1','true'):
+        page = [block_header(b) for b in page]
+    else:
+        page = [approvals.apply(b) for b in page]
+    out = jsonify(page)
+    out.set_etag(etag)
+    out.headers['X-Chain-Height'] = str(len(chain))
+    if end < len(chain):
+        out.headers['X-Next-From'] = str(end)
+    return out,200
+
+@app.route('/chain/stream', methods=['GET'])
+def chain_stream():
+    """
+    Server-Sent Events stream of chain changes: 'block' for each block joining
+    the active chain, 'reorg' (fork_height, disconnected hashes) before the
+    blocks of a new branch, and 'update' when a shift is approved or rejected.
+    The first event, 'tip', gives the current height and tip hash.
+
+    Returns:
+        Response: text/event-stream response that stays open.
+    """
+    q = queue.Queue(STREAM_QUEUE)
+    with subscribers_lock:
+        subscribers.append(q)
+        chain = chain_state.snapshot()
+        tip = {'height':len(chain)-1,'hash':chain[-1]['hash'] if chain else None}
+
+    def events():
+        try:
+            yield f"event: tip\ndata: {json.dumps(tip)}\n\n"
+            while True:
+                try:
+                    msg = q.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if msg is None:
+                    break
+                yield msg
+        finally:
+            with subscribers_lock:
+                if q in subscribers:
+                    subscribers.remove(q)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control':'no-cache','X-Accel-Buffering':'no'})
+
+@app.route('/proof', methods=['GET'])
+def shift_proof():
+    """
+    Return one shift with its Merkle inclusion proof and block header, so it can
+    be checked against the chain without downloading every block. The
+    transaction is the one committed to by the block, as it was mined; a later
+    supervisor decision is returned separately, as it is not covered by the proof.
+
+    Returns:
+        Response: JSON with the transaction, its leaf hash, the proof, the header
+            and the current supervisor_signature.
+    """
+    bh = request.args.get('block_hash'); ti = request.args.get('tx_index', type=int)
+    if bh is None or ti is None:
+        return jsonify({'error':'block_hash & tx_index required'}),400
+    b = get_block(bh)
+    if b is None or not 0<=ti<len(b['transactions']):
+        return jsonify({'error':'Not found'}),404
+    tree = MerkleTree.from_transactions(b['transactions'])
+    chain = chain_state.snapshot()
+    h = b.get('height', b['index'])
+    return jsonify({
+        'transaction': b['transactions'][ti],
+        'tx_hash': tree.levels[0][ti],
+        'proof': tree.proof(ti),
+        'header': block_header(b),
+        'supervisor_signature': approvals.transaction(b, ti)['supervisor_signature'],
+        'height': h,
+        'on_active_chain': h<len(chain) and chain[h]['hash']==bh
+    }),200
+
+@app.route('/shifts', methods=['GET'])
+def worker_shifts():
+    """
+    List a worker's shifts on the active chain, optionally limited to a date
+    range, in date and start-time order.
+
+    Query parameters: worker_id, from and to (inclusive YYYY-MM-DD dates).
+
+    Returns:
+        Response: JSON list of shifts with their block index, block hash and tx index.
+    """
+    worker = request.args.get('worker_id')
+    if not worker:
+        return jsonify({'error':'worker_id required'}),400
+    d0, d1 = request.args.get('from'), request.args.get('to')
+    chain_ready.wait()
+    chain = chain_state.snapshot()
+    out = []
+    # The index is live and may be ahead of the snapshot, so check each row against it.
+    for h, i in chain_index.shifts(worker, d0, d1):
+        if h < len(chain) and i < len(chain[h]['transactions']):
+            b = chain[h]; tx = b['transactions'][i]
+            if shift_matches(tx, worker, d0, d1):
+                out.append({'block_index':h,'block_hash':b['hash'],'tx_index':i,
+                            'transaction':approvals.transaction(b, i)})
+    return jsonify(out),200
+
+def shift_matches(tx, worker, start=None, end=None):
+    """
+    Check a shift against a worker and an inclusive date range.
+
+    Args:
+        tx (dict): The transaction.
+        worker (str): Worker ID, or None for any worker.
+        start (str, optional): First date included.
+        end (str, optional): Last date included; a prefix such as 2025-05 covers the month.
 
     Returns:
-        Response: JSON representation of the blockchain.
+        bool: True if the shift matches.
     """
-    return jsonify(peer_state['blockchain']),200
+    return (worker is None or tx['worker_id'] == worker) \
+        and (start is None or tx['date'] >= start) \
+        and (end is None or tx['date'][:len(end)] <= end)
 
 @app.route('/approve', methods=['POST'])
 def approve_shift():
@@ -79,11 +402,11 @@ def approve_shift():
     bh = data.get('block_hash'); ti = data.get('tx_index')
     if bh is None or ti is None:
         return jsonify({'error':'block_hash & tx_index required'}),400
-    for b in peer_state['blockchain']:
-        if b['hash']==bh and 0<=ti<len(b['transactions']):
-            b['transactions'][ti]['supervisor_signature']='Approved by manager1'
-            return jsonify({'status':'approved'}),200
-    return jsonify({'error':'Not found'}),404
+    tx = record_decision(bh, ti, 'Approved by manager1')
+    if tx is None:
+        return jsonify({'error':'Not found'}),404
+    publish('update', {'block_hash':bh,'tx_index':ti,'supervisor_signature':tx['supervisor_signature']})
+    return jsonify({'status':'approved'}),200
 
 @app.route('/reject', methods=['POST'])
 def reject_shift():
@@ -99,66 +422,151 @@ def reject_shift():
     bh = data.get('block_hash'); ti = data.get('tx_index')
     if bh is None or ti is None:
         return jsonify({'error':'block_hash & tx_index required'}),400
-    for b in peer_state['blockchain']:
-        if b['hash']==bh and 0<=ti<len(b['transactions']):
-            b['transactions'][ti]['supervisor_signature']='Rejected by manager1'
-            return jsonify({'status':'rejected'}),200
-    return jsonify({'error':'Not found'}),404
+    tx = record_decision(bh, ti, 'Rejected by manager1')
+    if tx is None:
+        return jsonify({'error':'Not found'}),404
+    publish('update', {'block_hash':bh,'tx_index':ti,'supervisor_signature':tx['supervisor_signature']})
+    return jsonify({'status':'rejected'}),200
+
+EXPORT_COLUMNS = ['block_index','timestamp','worker_id','date','start','end',
+                  'worker_signature','supervisor_signature','block_hash','tx_index']
+EXPORT_CHUNK   = 64 * 1024     # bytes of CSV gathered before a chunk is sent
+
+class LineWriter:
+    """
+    File-like target that hands each line written by csv.writer straight back.
+    """
+    def write(self, line):
+        return line
+
+def export_locations(chain, args):
+    """
+    Select the shifts to export, in chain order.
+
+    Args:
+        chain (list): Snapshot of the active chain.
+        args (dict): Query parameters: from_block/to_block (inclusive heights),
+            from_date/to_date (inclusive dates), worker_id, and cursor
+            ("<block_index>:<tx_index>" of the last row already received).
+
+    Yields:
+        tuple: (height, tx_index) of each matching shift.
+
+    Raises:
+        ValueError: If a parameter is malformed.
+    """
+    lo = int(args.get('from_block', 0))
+    hi = min(int(args.get('to_block', len(chain)-1)), len(chain)-1)
+    after = (-1, -1)
+    if args.get('cursor'):
+        h, i = args['cursor'].split(':')
+        after = (int(h), int(i))
+        lo = max(lo, after[0])
+    d0, d1, worker = args.get('from_date'), args.get('to_date'), args.get('worker_id')
+
+    if worker:
+        # The per-worker index narrows by worker and date, but it is live and
+        # may be ahead of the snapshot, so each hit is checked against it.
+        for h, i in sorted(chain_index.shifts(worker, d0, d1)):
+            if lo <= h <= hi and (h, i) > after and i < len(chain[h]['transactions']) \
+               and shift_matches(chain[h]['transactions'][i], worker, d0, d1):
+                yield h, i
+        return
+    for h in range(max(lo, 0), hi+1):
+        for i, tx in enumerate(chain[h]['transactions']):
+            if (h, i) > after and shift_matches(tx, None, d0, d1):
+                yield h, i
+
+def export_rows(chain, locations):
+    """
+    Render selected shifts as CSV text, a chunk at a time.
+
+    Args:
+        chain (list): Snapshot of the active chain.
+        locations (iterable): (height, tx_index) pairs to write.
+
+    Yields:
+        str: CSV text of roughly EXPORT_CHUNK characters, header first.
+    """
+    w = csv.writer(LineWriter())
+    buf = [w.writerow(EXPORT_COLUMNS)]; size = 0
+    for h, i in locations:
+        if h >= len(chain) or i >= len(chain[h]['transactions']):
+            continue
+        b = chain[h]; tx = approvals.transaction(b, i)
+        line = w.writerow([
+            b['index'], b['timestamp'],
+            tx['worker_id'], tx['date'],
+            tx['shift_start'], tx['shift_end'],
+            tx['worker_signature'], tx.get('supervisor_signature',''),
+            b['hash'], i
+        ])
+        buf.append(line); size += len(line)
+        if size >= EXPORT_CHUNK:
+            yield ''.join(buf); buf = []; size = 0
+    if buf:
+        yield ''.join(buf)
+
+def gzip_stream(chunks):
+    """
+    Gzip a stream of text chunks.
+
+    Args:
+        chunks (iterable): Text to compress.
+
+    Yields:
+        bytes: Compressed data.
+    """
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk.encode())
+        if out:
+            yield out
+    yield z.flush()
 
 @app.route('/export', methods=['GET'])
 def export_chain():
     """
-    Export the blockchain as a CSV file.
+    Export shifts as a streamed CSV file, optionally limited by block range,
+    date range and worker, and resumable with a cursor. Add compress=gzip for
+    a gzip-compressed file.
 
     Returns:
-        Response: CSV file containing all blockchain transactions.
-    """
-    si = StringIO(); w = csv.writer(si)
-    w.writerow(['block_index','timestamp','worker_id','date','start','end',
-                'worker_signature','supervisor_signature','block_hash'])
-    for b in peer_state['blockchain']:
-        for tx in b['transactions']:
-            w.writerow([
-                b['index'], b['timestamp'],
-                tx['worker_id'], tx['date'],
-                tx['shift_start'], tx['shift_end'],
-                tx['worker_signature'], tx.get('supervisor_signature',''),
-                b['hash']
-            ])
-    out = make_response(si.getvalue())
-    out.headers["Content-Disposition"]="attachment; filename=chain.csv"
-    out.headers["Content-Type"]="text/csv"
+        Response: CSV rows (with block_index and tx_index for resuming), streamed
+            as they are generated.
+    """
+    chain_ready.wait()
+    chain = chain_state.snapshot()
+    try:
+        locations = export_locations(chain, request.args)
+        first = next(locations, None)
+    except ValueError:
+        return jsonify({'error':'from_block, to_block and cursor must be integers (cursor: block:tx)'}),400
+    if first is not None:
+        locations = itertools.chain([first], locations)
+    else:
+        locations = iter(())
+    body = export_rows(chain, locations)
+    name = 'chain.csv'
+    if request.args.get('compress') == 'gzip':
+        body, name = gzip_stream(body), 'chain.csv.gz'
+        out = Response(body, mimetype='application/gzip')
+    else:
+        out = Response(body, mimetype='text/csv')
+    out.headers["Content-Disposition"]=f"attachment; filename={name}"
     return out
 
 @app.route('/anomalies', methods=['GET'])
 def detect_anomalies():
     """
-    Detect overlapping shift transactions in the blockchain.
+    Report overlapping shift transactions in the blockchain. Overlaps are found
+    incrementally as blocks join or leave the active chain (see anomalies.py).
 
     Returns:
         Response: JSON list of detected anomalies.
     """
-    anomalies=[]; per_worker={}
-    from datetime import datetime as dt
-    for b in peer_state['blockchain']:
-        for tx in b['transactions']:
-            per_worker.setdefault(tx['worker_id'],[]).append(
-                (tx['date'],tx['shift_start'],tx['shift_end'],b['index']))
-    for w,shifts in per_worker.items():
-        parsed=[]
-        for date,s,e,idx in shifts:
-            parsed.append((dt.fromisoformat(f"{date}T{s}"),
-                           dt.fromisoformat(f"{date}T{e}"), idx))
-        parsed.sort()
-        for i in range(len(parsed)-1):
-            s1,e1,i1 = parsed[i]; s2,e2,i2 = parsed[i+1]
-            if s2<e1:
-                anomalies.append({
-                    'worker_id':w,'block1':i1,'block2':i2,
-                    'overlap_start':s2.isoformat(),
-                    'overlap_end':e1.isoformat()
-                })
-    return jsonify(anomalies),200
+    chain_ready.wait()
+    return jsonify(overlaps.anomalies()),200
 
 @app.route('/test-tamper', methods=['GET'])
 def test_tamper():
@@ -168,24 +576,35 @@ def test_tamper():
     Returns:
         Response: JSON status of the tamper attempt.
     """
-    if not peer_state['blockchain']:
+    chain = chain_state.snapshot()
+    if not chain:
         return jsonify({'error':'no blocks'}),400
-    blk = copy.deepcopy(peer_state['blockchain'][0])
+    blk = copy.deepcopy(chain[0])
     blk['transactions'][0]['worker_id']='TAMPER'
     broadcast_to_peers({'type':'NEW_BLOCK','block':blk})
     return jsonify({'status':'tamper attempt sent'}),200
 
 if __name__ == '__main__':
-    if len(sys.argv) not in (4,5):
-        print('Usage: python demo_api.py <peer_port> <tracker_ip> <tracker_port> [<api_port>]')
+    use_asyncio = '--asyncio' in sys.argv
+    target_mode = '--target-mode' in sys.argv
+    args = [a for a in sys.argv if a not in ('--asyncio','--target-mode')]
+    data_dir = None
+    if '--data-dir' in args:
+        i = args.index('--data-dir')
+        data_dir = args[i+1]
+        del args[i:i+2]
+    if len(args) not in (4,5,6):
+        print('Usage: python demo_api.py <peer_port> <tracker_ip> <tracker_port> [<api_port>] [<mining_workers>] [--asyncio] [--target-mode] [--data-dir <dir>]')
         sys.exit(1)
-    peer_port    = int(sys.argv[1])
-    tracker_ip   = sys.argv[2]
-    tracker_port = int(sys.argv[3])
-    api_port     = int(sys.argv[4]) if len(sys.argv)==5 else 5000
+    peer_port    = int(args[1])
+    tracker_ip   = args[2]
+    tracker_port = int(args[3])
+    api_port     = int(args[4]) if len(args)>=5 else 5000
+    workers      = int(args[5]) if len(args)==6 else 1
 
     threading.Thread(target=run_peer,
-                     args=(peer_port,tracker_ip,tracker_port),
+                     args=(peer_port,tracker_ip,tracker_port,workers,use_asyncio,
+                           data_dir or f'data/{peer_port}',target_mode),
                      daemon=True).start()
 
     # TLS setup (generate with: openssl req -x509 -newkey rsa:4096 -keyout server.key -out server.crt -days 365)
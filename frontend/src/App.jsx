@@ -96,6 +96,81 @@ function LoginPage() {
   );
 }
 
+// — Live chain —
+// Loads the chain whenever the event stream (re)connects, then applies the
+// blocks, reorgs and approval updates it pushes instead of re-downloading.
+function useChain() {
+  const [chain, setChain] = useState([]);
+
+  useEffect(() => {
+    const events = new EventSource(`${API_URL}/chain/stream`);
+    let current = [];
+    // Events that arrive while /chain is being fetched; null when no fetch is
+    // in flight. They are replayed onto the fetched chain so none are lost.
+    let pending = null;
+
+    function apply(c, type, data) {
+      if (type === "block") return [...c.slice(0, data.index), data];
+      if (type === "reorg") return c.slice(0, data.fork_height + 1);
+      const { block_hash, tx_index, supervisor_signature } = data;
+      return c.map((b) =>
+        b.hash !== block_hash
+          ? b
+          : {
+              ...b,
+              transactions: b.transactions.map((tx, i) =>
+                i === tx_index ? { ...tx, supervisor_signature } : tx
+              ),
+            }
+      );
+    }
+
+    async function load() {
+      const buffered = [];
+      pending = buffered;
+      let c;
+      try {
+        const res = await fetch(`${API_URL}/chain`);
+        c = await res.json();
+      } catch {
+        if (pending === buffered) pending = null;
+        return;
+      }
+      if (pending !== buffered) return; // a newer load superseded this one
+      pending = null;
+      for (const [type, data] of buffered) {
+        if (type === "block" && data.index > c.length) return load();
+        c = apply(c, type, data);
+      }
+      current = c;
+      setChain(c);
+    }
+
+    function onEvent(type, e) {
+      const data = JSON.parse(e.data);
+      if (pending) {
+        pending.push([type, data]);
+        return;
+      }
+      // A block past the end means events were missed; reload the chain.
+      if (type === "block" && data.index > current.length) {
+        load();
+        return;
+      }
+      current = apply(current, type, data);
+      setChain(current);
+    }
+
+    events.onopen = load;
+    for (const type of ["block", "reorg", "update"]) {
+      events.addEventListener(type, (e) => onEvent(type, e));
+    }
+    return () => events.close();
+  }, []);
+
+  return chain;
+}
+
 // — Worker Dashboard —
 function WorkerPage() {
   const { user, logout } = useAuth();
@@ -103,15 +178,7 @@ function WorkerPage() {
   const [start, setStart] = useState("");
   const [end, setEnd] = useState("");
   const [sig, setSig] = useState("");
-  const [shifts, setShifts] = useState([]);
-
-  useEffect(() => {
-    fetchChain();
-  }, []);
-  async function fetchChain() {
-    const res = await fetch(`${API_URL}/chain`);
-    setShifts(await res.json());
-  }
+  const shifts = useChain();
 
   async function logShift(e) {
     e.preventDefault();
@@ -127,7 +194,7 @@ function WorkerPage() {
         worker_signature: sig,
       }),
     });
-    fetchChain();
+    // The shift appears once its block arrives on the chain stream.
   }
 
   return (
@@ -179,15 +246,8 @@ function WorkerPage() {
 // — Manager Dashboard —
 function ManagerPage() {
   const { logout } = useAuth();
-  const [shifts, setShifts] = useState([]);
+  const shifts = useChain();
 
-  useEffect(() => {
-    fetchChain();
-  }, []);
-  async function fetchChain() {
-    const res = await fetch(`${API_URL}/chain`);
-    setShifts(await res.json());
-  }
   async function decision(hash, idx, action) {
     await fetch(`${API_URL}/${action}`, {
       method: "POST",
@@ -199,7 +259,6 @@ function ManagerPage() {
         tx_index: idx,
       }),
     });
-    fetchChain();
   }
 
   return (
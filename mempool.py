@@ -0,0 +1,157 @@
+# mempool.py
+
+import threading
+import time
+from collections import OrderedDict
+from blockchain import Transaction
+from merkle import tx_hash
+
+class Mempool:
+    """
+    Pending transactions keyed by transaction ID (the Merkle leaf hash of the
+    transaction), kept in arrival order.
+    """
+    def __init__(self):
+        """
+        Create an empty mempool.
+        """
+        self._txs = OrderedDict()   # txid -> Transaction, oldest first
+        self._arrived = {}          # txid -> time added (0 for transactions restored by a reorg)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def __contains__(self, txid):
+        return txid in self._txs
+
+    def __len__(self):
+        return len(self._txs)
+
+    def get(self, txid):
+        """
+        Look up a pending transaction.
+
+        Args:
+            txid (str): Transaction ID.
+
+        Returns:
+            Transaction or None: The transaction, if pending.
+        """
+        return self._txs.get(txid)
+
+    def add(self, tx):
+        """
+        Add a transaction unless an identical one is already pending.
+
+        Args:
+            tx (Transaction): The transaction.
+
+        Returns:
+            bool: True if added, False if it was a duplicate.
+        """
+        txid = tx.txid()
+        with self._lock:
+            if txid in self._txs:
+                return False
+            self._txs[txid] = tx
+            self._arrived[txid] = time.time()
+            self._changed.notify_all()
+            return True
+
+    def add_many(self, txs, front=False):
+        """
+        Add several transactions, skipping duplicates.
+
+        Args:
+            txs (list): Transactions in order.
+            front (bool, optional): Put them ahead of the transactions already pending,
+                keeping their relative order, and make them due for mining at once.
+                Defaults to False.
+
+        Returns:
+            list: One bool per transaction, False for duplicates.
+        """
+        keyed = [(tx.txid(), tx) for tx in txs]
+        added = []
+        now = 0 if front else time.time()
+        with self._lock:
+            for txid, tx in keyed:
+                if txid not in self._txs:
+                    self._txs[txid] = tx
+                    self._arrived[txid] = now
+                    added.append(txid)
+            if front:
+                for txid in reversed(added):
+                    self._txs.move_to_end(txid, last=False)
+            if added:
+                self._changed.notify_all()
+        added = set(added)
+        return [txid in added for txid, _ in keyed]
+
+    def remove_many(self, txids):
+        """
+        Drop transactions by ID, ignoring any that are not pending.
+
+        Args:
+            txids (iterable): Transaction IDs.
+
+        Returns:
+            int: Number of transactions removed.
+        """
+        with self._lock:
+            before = len(self._txs)
+            for txid in txids:
+                if self._txs.pop(txid, None) is not None:
+                    del self._arrived[txid]
+            return before - len(self._txs)
+
+    def take(self, n=None):
+        """
+        Return the oldest pending transactions without removing them.
+
+        Args:
+            n (int, optional): Maximum number to return. Defaults to all.
+
+        Returns:
+            list: Transactions in arrival order.
+        """
+        with self._lock:
+            txs = list(self._txs.values())
+        return txs if n is None else txs[:n]
+
+    def wait_for_batch(self, size, max_wait):
+        """
+        Block until a block's worth of transactions is pending or the oldest
+        pending transaction has waited `max_wait` seconds.
+
+        Args:
+            size (int): Number of pending transactions that fills a block.
+            max_wait (float): Longest a transaction should wait for more to arrive.
+        """
+        with self._changed:
+            while True:
+                if len(self._txs) >= size:
+                    return
+                if self._txs:
+                    age = time.time() - self._arrived[next(iter(self._txs))]
+                    if age >= max_wait:
+                        return
+                    self._changed.wait(max_wait - age)
+                else:
+                    self._changed.wait()
+
+    def apply_reorg(self, connected, disconnected=()):
+        """
+        Update the pool after the active chain changes: transactions from
+        disconnected blocks go back to the front of the pool, then everything
+        confirmed by the connected blocks is evicted.
+
+        Args:
+            connected (list): Blocks added to the active chain.
+            disconnected (list, optional): Blocks removed from the active chain. Defaults to ().
+        """
+        confirmed = {tx_hash(tx) for b in connected for tx in b["transactions"]}
+        restored = [Transaction.from_dict(tx) for b in disconnected
+                    for tx in b["transactions"] if tx_hash(tx) not in confirmed]
+        if restored:
+            self.add_many(restored, front=True)
+        self.remove_many(confirmed)
@@ -0,0 +1,127 @@
+# merkle.py
+
+import hashlib
+import json
+
+def tx_hash(tx):
+    """
+    Hash a transaction dictionary into a Merkle leaf.
+
+    Args:
+        tx (dict): The transaction.
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON encoding.
+    """
+    return hashlib.sha256(json.dumps(tx, sort_keys=True).encode()).hexdigest()
+
+def hash_pair(left, right):
+    """
+    Hash two child nodes into their parent.
+
+    Args:
+        left (str): Left child hash.
+        right (str): Right child hash.
+
+    Returns:
+        str: The parent hash.
+    """
+    return hashlib.sha256((left + right).encode()).hexdigest()
+
+class MerkleTree:
+    """
+    A Merkle tree over transaction hashes that keeps every level, so inclusion
+    proofs can be produced. An odd node at the end of a level is paired with itself.
+    """
+    def __init__(self, leaves):
+        """
+        Build the tree.
+
+        Args:
+            leaves (list): Leaf hashes in transaction order.
+        """
+        self.levels = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append([
+                hash_pair(level[i], level[i+1] if i+1 < len(level) else level[i])
+                for i in range(0, len(level), 2)
+            ])
+
+    @classmethod
+    def from_transactions(cls, txs):
+        """
+        Build a tree from transaction dictionaries.
+
+        Args:
+            txs (list): Transactions as dictionaries.
+
+        Returns:
+            MerkleTree: The tree.
+        """
+        return cls([tx_hash(tx) for tx in txs])
+
+    @property
+    def root(self):
+        """
+        str: The Merkle root, or '' for an empty tree.
+        """
+        return self.levels[-1][0] if self.levels[0] else ''
+
+    def proof(self, index):
+        """
+        Produce the inclusion proof for one leaf.
+
+        Args:
+            index (int): Position of the leaf.
+
+        Returns:
+            list: Sibling hashes from leaf to root, each as {"hash", "position"} where
+                position says which side the sibling sits on.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        if not 0 <= index < len(self.levels[0]):
+            raise IndexError(f"leaf {index} out of range")
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling >= len(level):
+                sibling = index
+            path.append({"hash": level[sibling],
+                         "position": "left" if index % 2 else "right"})
+            index //= 2
+        return path
+
+def merkle_root(txs):
+    """
+    Compute the Merkle root of a list of transaction dictionaries.
+
+    Args:
+        txs (list): Transactions as dictionaries.
+
+    Returns:
+        str: The Merkle root hash.
+    """
+    return MerkleTree.from_transactions(txs).root
+
+def verify_proof(leaf, proof, root):
+    """
+    Check an inclusion proof against a Merkle root.
+
+    Args:
+        leaf (str): Hash of the transaction being proved.
+        proof (list): Path returned by MerkleTree.proof().
+        root (str): Expected Merkle root.
+
+    Returns:
+        bool: True if the leaf is included under the root.
+    """
+    h = leaf
+    for step in proof:
+        if step["position"] == "left":
+            h = hash_pair(step["hash"], h)
+        else:
+            h = hash_pair(h, step["hash"])
+    return h == root
@@ -0,0 +1,248 @@
+# mining.py
+
+import hashlib
+import multiprocessing as mp
+import os
+import queue
+import threading
+
+CHUNK_SIZE = 20000      # contiguous nonces a worker takes before striding ahead
+BATCH_SIZE = 4096       # nonces tested per call to search_nonces() between stop checks
+ABORT_POLL = 0.005      # seconds between abort checks while waiting on pool workers
+
+MAX_TARGET = 2**256 - 1     # easiest possible target: every hash is valid
+
+def difficulty_to_target(difficulty):
+    """
+    Convert a leading-hex-zeros difficulty to the equivalent numeric target.
+    A hash has `difficulty` leading hex zeros exactly when its value is at most this.
+
+    Args:
+        difficulty (int): Number of leading hex zeros.
+
+    Returns:
+        int: The 256-bit target.
+    """
+    return 2**(256 - 4 * difficulty) - 1
+
+def target_to_difficulty(target):
+    """
+    Number of leading hex zeros every hash meeting a target is guaranteed to have.
+
+    Args:
+        target (int): The 256-bit target.
+
+    Returns:
+        int: The difficulty.
+    """
+    return (256 - target.bit_length()) // 4
+
+def target_work(target):
+    """
+    Expected number of hashes needed to meet a target.
+
+    Args:
+        target (int): The 256-bit target.
+
+    Returns:
+        int: The work, 2**256 // (target + 1).
+    """
+    return 2**256 // (target + 1)
+
+def search_nonces(prefix, target, start, count):
+    """
+    Test a batch of nonces against a header prefix using a precomputed SHA-256 midstate.
+
+    The prefix is hashed once; each nonce clones that state and only hashes its own
+    digits, so the result is identical to SHA256(prefix + str(nonce)).
+
+    Args:
+        prefix (str): Block header without the nonce.
+        target (int): Largest valid hash value.
+        start (int): First nonce of the batch.
+        count (int): Number of nonces to test.
+
+    Returns:
+        tuple or None: (nonce, hash) for the first valid nonce in the batch, else None.
+    """
+    copy = hashlib.sha256(prefix.encode()).copy
+    limit = target.to_bytes(32, "big")      # equal-length bytes compare as big-endian numbers
+    for nonce in range(start, start + count):
+        h = copy()
+        h.update(b'%d' % nonce)
+        if h.digest() <= limit:
+            return nonce, h.hexdigest()
+    return None
+
+def _search(prefix, target, start, stride, chunk, stop, counter):
+    """
+    Scan a strided slice of the nonce space until a valid nonce is found or
+    the stop event is set.
+
+    Args:
+        prefix (str): Block header without the nonce.
+        target (int): Largest valid hash value.
+        start (int): First nonce of this worker's first chunk.
+        stride (int): Distance between this worker's consecutive chunks.
+        chunk (int): Number of nonces per chunk.
+        stop (Event): Shared event signalling all workers to stop.
+        counter (Value): Shared counter of hashes computed.
+
+    Returns:
+        tuple or None: (nonce, hash) if found, else None.
+    """
+    base = start
+    while True:
+        for offset in range(0, chunk, BATCH_SIZE):
+            if stop.is_set():
+                return None
+            first = base + offset
+            size = min(BATCH_SIZE, chunk - offset)
+            hit = search_nonces(prefix, target, first, size)
+            with counter.get_lock():
+                counter.value += (hit[0] - first + 1) if hit else size
+            if hit is not None:
+                return hit
+        base += stride
+
+def _worker(jobs, results, stop, counter):
+    """
+    Worker process main loop: take search jobs and report results.
+
+    Args:
+        jobs (Queue): Incoming (job_id, prefix, target, start, stride, chunk) jobs.
+        results (Queue): Outgoing ("found" | "done", job_id, payload) messages.
+        stop (Event): Shared stop event.
+        counter (Value): Shared hash counter.
+    """
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, prefix, target, start, stride, chunk = job
+        hit = _search(prefix, target, start, stride, chunk, stop, counter)
+        if hit is not None:
+            stop.set()
+            results.put(("found", job_id, hit))
+        results.put(("done", job_id, None))
+
+class MiningPool:
+    """
+    A persistent pool of worker processes that search the nonce space in parallel.
+    """
+    def __init__(self, workers=None, chunk=CHUNK_SIZE):
+        """
+        Start the worker processes.
+
+        Args:
+            workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            chunk (int, optional): Nonces per chunk. Defaults to CHUNK_SIZE.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        ctx = mp.get_context("spawn")
+        self._jobs = ctx.Queue()
+        self._results = ctx.Queue()
+        self._stop = ctx.Event()
+        self._counter = ctx.Value('Q', 0)
+        self._job_id = 0
+        self._lock = threading.Lock()
+        self._procs = [
+            ctx.Process(target=_worker,
+                        args=(self._jobs, self._results, self._stop, self._counter),
+                        daemon=True)
+            for _ in range(self.workers)
+        ]
+        for p in self._procs:
+            p.start()
+
+    def search(self, prefix, target, start_nonce=0, abort=None):
+        """
+        Find a nonce such that SHA256(prefix + nonce) is at most `target`.
+
+        Args:
+            prefix (str): Block header without the nonce.
+            target (int): Largest valid hash value.
+            start_nonce (int, optional): First nonce to try. Defaults to 0.
+            abort (threading.Event, optional): When set, all workers stop and the
+                search gives up. Defaults to None.
+
+        Returns:
+            tuple: (nonce, hash, hashes) where hashes is the number of attempts made.
+                nonce and hash are None if the search was aborted.
+        """
+        with self._lock:
+            return self._run(prefix, target, start_nonce, abort)
+
+    def _run(self, prefix, target, start_nonce, abort):
+        self._job_id += 1
+        self._stop.clear()
+        with self._counter.get_lock():
+            self._counter.value = 0
+        stride = self.workers * self.chunk
+        for k in range(self.workers):
+            self._jobs.put((self._job_id, prefix, target,
+                            start_nonce + k * self.chunk, stride, self.chunk))
+
+        best = None
+        pending = self.workers
+        while pending:
+            if abort is not None and abort.is_set():
+                self._stop.set()
+            try:
+                kind, job_id, payload = self._results.get(timeout=ABORT_POLL)
+            except queue.Empty:
+                continue
+            if job_id != self._job_id:
+                continue
+            if kind == "done":
+                pending -= 1
+            elif best is None or payload[0] < best[0]:
+                best = payload
+        if best is None:
+            return None, None, self._counter.value
+        return best[0], best[1], self._counter.value
+
+    def close(self):
+        """
+        Stop all worker processes.
+        """
+        self._stop.set()
+        for _ in self._procs:
+            self._jobs.put(None)
+        for p in self._procs:
+            p.join(timeout=1)
+
+_pools = {}
+
+def get_pool(workers):
+    """
+    Return a shared MiningPool with the given number of workers, creating it on first use.
+
+    Args:
+        workers (int): Number of worker processes.
+
+    Returns:
+        MiningPool: The pool.
+    """
+    if workers not in _pools:
+        _pools[workers] = MiningPool(workers)
+    return _pools[workers]
+
+def hashrate(hashes, seconds):
+    """
+    Format a hash count over a duration as a human-readable rate.
+
+    Args:
+        hashes (int): Number of hashes computed.
+        seconds (float): Elapsed time in seconds.
+
+    Returns:
+        str: Rate such as "812.4 kH/s".
+    """
+    rate = hashes / seconds if seconds > 0 else 0.0
+    for unit in ("H/s", "kH/s", "MH/s"):
+        if rate < 1000:
+            return f"{rate:.1f} {unit}"
+        rate /= 1000
+    return f"{rate:.1f} GH/s"
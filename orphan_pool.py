@@ -0,0 +1,109 @@
+# orphan_pool.py
+
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ORPHANS = 500       # blocks kept before the oldest are evicted
+ORPHAN_TTL  = 600       # seconds an orphan may wait for its parent
+
+class OrphanPool:
+    """
+    Blocks whose parent is unknown, indexed by their own hash and by prev_hash,
+    bounded in size and age.
+    """
+    def __init__(self, max_size=MAX_ORPHANS, max_age=ORPHAN_TTL):
+        """
+        Create an empty pool.
+
+        Args:
+            max_size (int, optional): Maximum number of orphans held. Defaults to MAX_ORPHANS.
+            max_age (int, optional): Seconds before an orphan expires. Defaults to ORPHAN_TTL.
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self._blocks = OrderedDict()    # hash -> (block, received_at, source), oldest first
+        self._by_parent = {}            # prev_hash -> set of orphan hashes
+        self._lock = threading.Lock()
+
+    def __contains__(self, h):
+        return h in self._blocks
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def get(self, h):
+        """
+        Look up an orphan by hash.
+
+        Args:
+            h (str): Block hash.
+
+        Returns:
+            dict or None: The orphan block, if held.
+        """
+        entry = self._blocks.get(h)
+        return entry[0] if entry else None
+
+    def add(self, block, source=None):
+        """
+        Store an orphan, evicting expired orphans and then the oldest ones if the pool is full.
+
+        Args:
+            block (dict): The orphan block.
+            source (tuple, optional): (ip, port) of the peer that sent it. Defaults to None.
+
+        Returns:
+            bool: True if the block was added, False if it was already held.
+        """
+        h = block["hash"]
+        with self._lock:
+            if h in self._blocks:
+                return False
+            now = time.time()
+            self._expire(now)
+            while len(self._blocks) >= self.max_size:
+                self._remove(next(iter(self._blocks)))
+            self._blocks[h] = (block, now, source)
+            self._by_parent.setdefault(block["prev_hash"], set()).add(h)
+            return True
+
+    def pop_children(self, parent_hash):
+        """
+        Remove and return every orphan whose parent is `parent_hash`.
+
+        Args:
+            parent_hash (str): Hash of a block that has just been accepted.
+
+        Returns:
+            list: (block, source) pairs.
+        """
+        with self._lock:
+            children = []
+            for h in list(self._by_parent.get(parent_hash, ())):
+                block, _, source = self._remove(h)
+                children.append((block, source))
+            return children
+
+    def expire(self):
+        """
+        Drop orphans older than the pool's maximum age.
+        """
+        with self._lock:
+            self._expire(time.time())
+
+    def _expire(self, now):
+        while self._blocks:
+            h, (_, received_at, _) = next(iter(self._blocks.items()))
+            if now - received_at <= self.max_age:
+                break
+            self._remove(h)
+
+    def _remove(self, h):
+        entry = self._blocks.pop(h)
+        siblings = self._by_parent.get(entry[0]["prev_hash"])
+        if siblings is not None:
+            siblings.discard(h)
+            if not siblings:
+                del self._by_parent[entry[0]["prev_hash"]]
+        return entry
@@ -1,21 +1,63 @@
 # peer.py
 
+import asyncio
+import os
 import socket
 import threading
-import json
 import time
 import sys
 import atexit
 import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from blockchain import Block, Transaction
+from approvals import Approvals
+from blockchain import Block, Transaction, verify_transactions
+from blockstore import BlockMap, BlockStore
+from chain_index import ChainIndex
+from chainstate import ChainState
+from mempool import Mempool
+from merkle import merkle_root
+from mining import MAX_TARGET, difficulty_to_target, hashrate, target_to_difficulty, target_work
+from orphan_pool import OrphanPool
+from pool import ConnectionPool
+from wire import answer_hello, chain_frames, encode_msg, iter_chain, negotiate, read_msg, recv_msg, send_msg
 
-peer_state   = {"peers": [], "blockchain": []}
-mempool      = []
+peer_state   = {"peers": [], "peers_version": None, "address": None,
+                "hashrate": None, "port": None}
+chain_state  = ChainState()         # the active chain: writer lock and read snapshots
+mempool      = Mempool()            # pending transactions by txid
 DIFFICULTY   = 3
-block_map    = {}
-child_to_parent = {}
-orphans      = {}
+TARGET_MODE  = False    # mine against a numeric 256-bit target instead of leading hex zeros
+MAX_RETARGET = 4        # largest factor a retarget may move the target by
+MINING_WORKERS = 1      # processes used by mine_block(); >1 enables parallel mining
+MAX_BLOCK_TXS  = 500    # transactions per mined block
+MAX_BLOCK_WAIT = 2      # seconds a pending transaction waits for others before mining starts
+block_map    = {}                   # replaced by a disk-backed BlockMap when a data dir is used
+block_store  = None                 # BlockStore persisting blocks and the active chain
+approvals    = Approvals()          # supervisor decisions, kept out of the mined blocks
+chain_index  = ChainIndex()         # hash, txid and per-worker indexes over the active chain
+chain_listeners = [chain_index.apply_reorg, mempool.apply_reorg]
+                                    # called with (connected, disconnected) when the active chain changes
+chain_ready  = threading.Event()    # set once the listeners have seen the whole active chain
+chain_ready.set()
+orphans      = OrphanPool()         # blocks waiting for an unknown parent
+mining_abort = threading.Event()    # set by resolve_chain() when the tip changes
+pool         = ConnectionPool()     # outbound connections reused across broadcasts
+in_flight    = OrderedDict()        # block hash -> time we sent GETDATA for it, oldest first
+in_flight_lock = threading.Lock()
+GETDATA_TIMEOUT = 10                # seconds before an unanswered GETDATA may be retried
+MAX_IN_FLIGHT   = 4096              # outstanding GETDATA requests remembered at most
+HEADERS_FIRST_SYNC = True           # sync headers, then bodies in parallel ranges
+HEADER_FIELDS = ("index", "prev_hash", "merkle_root", "timestamp", "nonce", "difficulty", "target", "hash")
+HEADER_BATCH  = 2000                # headers per HEADERS frame
+BODY_RANGE    = 200                 # blocks fetched per body request during sync
+SYNC_TIMEOUT  = 10                  # socket timeout in seconds for sync requests
+VERIFY_SIGNATURES = False           # check transaction signatures (needs WORKER_KEYS/SUPERVISOR_KEYS)
+MAX_NEIGHBOURS = 8                  # peers we pick to send to; blocks reach the rest by relay
+MAX_INBOUND    = 16                 # peers that picked us, which we also relay to
+PEER_REFRESH   = 10                 # seconds between neighbour refreshes from the tracker
+inbound      = OrderedDict()        # (ip, port) -> last NEIGHBOUR time, oldest first
 
 def adjust_difficulty(chain, window=10, target_seconds=60):
     """
@@ -39,44 +81,145 @@ def adjust_difficulty(chain, window=10, target_seconds=60):
     diff = last.get("difficulty", DIFFICULTY)
     return max(1, int(diff * (actual / expected)))
 
+def adjust_target(chain, window=10, target_seconds=60):
+    """
+    Compute the numeric target for the next block: the average target of the
+    last `window` blocks scaled by how long they actually took against the
+    expected time. The factor is clamped to MAX_RETARGET either way, and
+    averaging keeps consecutive retargets from compounding.
+
+    Args:
+        chain (list): The blockchain to evaluate.
+        window (int, optional): Number of recent blocks to consider. Defaults to 10.
+        target_seconds (int, optional): Target time per block in seconds. Defaults to 60.
+
+    Returns:
+        int: New target.
+    """
+    if len(chain) < window + 1:
+        return difficulty_to_target(DIFFICULTY)
+    last = chain[-1]
+    prev = chain[-(window+1)]
+    actual = (datetime.fromisoformat(last["timestamp"]) -
+              datetime.fromisoformat(prev["timestamp"])).total_seconds()
+    expected = target_seconds * window
+    actual = min(max(actual, expected / MAX_RETARGET), expected * MAX_RETARGET)
+    average = sum(block_target(b) for b in chain[-window:]) // window
+    target = average * round(actual * 1000) // (expected * 1000)
+    return min(max(target, 1), MAX_TARGET)
+
 def register_with_tracker(tracker_ip, tracker_port, my_port):
     """
-    Register the peer with the tracker server and receive the current peer list.
+    Register the peer with the tracker server and receive a random sample of
+    peers to use as neighbours.
 
     Args:
         tracker_ip (str): IP address of the tracker.
         tracker_port (int): Port number of the tracker.
         my_port (int): Port number of this peer.
     """
-    msg = json.dumps({"type": "JOIN", "port": my_port})
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.connect((tracker_ip, tracker_port))
-    s.sendall(msg.encode())
-    resp = s.recv(4096)
-    peer_state["peers"] = json.loads(resp.decode())["peers"]
+    send_msg(s, {"type": "JOIN", "port": my_port, "sample": MAX_NEIGHBOURS})
+    reply = recv_msg(s)
     s.close()
+    peer_state["address"] = (reply["address"]["ip"], reply["address"]["port"])
+    apply_peer_update(reply)
     print("[PEER] Joined network. Peer list:", peer_state["peers"])
 
 def periodically_refresh_peers(tracker_ip, tracker_port):
     """
-    Periodically fetch the updated list of peers from the tracker.
+    Periodically refresh our neighbours from the tracker. We send the ones we
+    have; the tracker keeps those still alive and tops the set up with random
+    peers, so connections are reused and departed neighbours are replaced.
 
     Args:
         tracker_ip (str): IP address of the tracker.
         tracker_port (int): Port number of the tracker.
     """
     while True:
+        time.sleep(PEER_REFRESH)
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             s.connect((tracker_ip, tracker_port))
-            s.sendall(json.dumps({"type": "GET"}).encode())
-            data = s.recv(4096)
-            peer_state["peers"] = json.loads(data.decode())["peers"]
+            send_msg(s, {"type": "GET", "port": peer_state["port"],
+                         "sample": MAX_NEIGHBOURS, "have": peer_state["peers"]})
+            if apply_peer_update(recv_msg(s)):
+                print("[PEER] Refreshed peer list:", peer_state["peers"])
             s.close()
-            print("[PEER] Refreshed peer list:", peer_state["peers"])
         except Exception as e:
             print("[PEER] Error refreshing peers:", e)
-        time.sleep(10)
+        announce_neighbour(peer_state["peers"])
+
+def apply_peer_update(msg):
+    """
+    Update our neighbours from the tracker: either a new sample ("peers") or
+    the membership changes that concern us ("joined" / "left"). Departed
+    peers are dropped at once; new ones are taken only while there is room,
+    so the set never grows past MAX_NEIGHBOURS. The tracker only sends a
+    delta to the peers it affects, so deltas are applied whenever they are
+    newer than the version we hold; an older one, overtaken by a refresh, is
+    ignored.
+
+    Args:
+        msg (dict): Tracker reply or UPDATE_PEERS message.
+
+    Returns:
+        bool: True if the neighbour set changed.
+    """
+    me = peer_state["address"]
+    if "peers" in msg:
+        peers, joined = [], msg["peers"]
+    else:
+        held = peer_state["peers_version"]
+        if held is None or msg["version"] <= held:
+            return False
+        left = {(p["ip"], p["port"]) for p in msg["left"]}
+        peers = [p for p in peer_state["peers"] if (p["ip"], p["port"]) not in left]
+        joined = msg["joined"]
+    have = {(p["ip"], p["port"]) for p in peers}
+    for p in joined:
+        key = (p["ip"], p["port"])
+        if len(peers) < MAX_NEIGHBOURS and key != me and key not in have:
+            peers.append(p)
+            have.add(key)
+    peer_state["peers_version"] = msg.get("version")
+    for key in msg.get("left", ()):
+        inbound.pop((key["ip"], key["port"]), None)
+    if peers == peer_state["peers"]:
+        return False
+    added = [p for p in peers if p not in peer_state["peers"]]
+    peer_state["peers"] = peers
+    pool.retain(neighbours())
+    announce_neighbour(added)
+    return True
+
+def announce_neighbour(peers):
+    """
+    Tell peers we have picked them as neighbours, so they relay blocks back to
+    us. Links work both ways even for peers nobody else happened to pick.
+
+    Args:
+        peers (list): Peers as {"ip", "port"} dicts.
+    """
+    for p in peers:
+        pool.send(p["ip"], p["port"], {"type": "NEIGHBOUR", "port": peer_state["port"]})
+
+def neighbours():
+    """
+    List the peers we relay to: those we picked plus those that picked us and
+    announced themselves within the last few refreshes.
+
+    Returns:
+        list: Peers as {"ip", "port"} dicts.
+    """
+    cutoff = time.time() - 3 * PEER_REFRESH
+    peers = list(peer_state["peers"])
+    have = {(p["ip"], p["port"]) for p in peers}
+    for (ip, port), seen in list(inbound.items()):
+        if seen >= cutoff and (ip, port) not in have:
+            peers.append({"ip": ip, "port": port})
+    return peers
 
 def send_heartbeat(tracker_ip, tracker_port, my_port):
     """
@@ -91,7 +234,7 @@ def send_heartbeat(tracker_ip, tracker_port, my_port):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             s.connect((tracker_ip, tracker_port))
-            s.sendall(json.dumps({"type": "HEARTBEAT", "port": my_port}).encode())
+            send_msg(s, {"type": "HEARTBEAT", "port": my_port})
             s.close()
         except:
             pass
@@ -109,7 +252,7 @@ def leave_network(tracker_ip, tracker_port, my_port):
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s.connect((tracker_ip, tracker_port))
-        s.sendall(json.dumps({"type": "LEAVE", "port": my_port}).encode())
+        send_msg(s, {"type": "LEAVE", "port": my_port})
         s.close()
     except:
         pass
@@ -131,206 +274,782 @@ def start_peer_server(my_port):
 
 def handle_peer_connection(conn, addr):
     """
-    Handle incoming connections from other peers.
+    Handle an incoming connection from another peer. Peers keep their
+    connections open, so messages are processed until the sender closes it.
+    Replies use the codec agreed in the sender's HELLO, JSON until then.
 
     Args:
         conn (socket): The socket connection.
         addr (tuple): The address of the sender.
     """
+    fmt = {}
     try:
-        data = conn.recv(65536).decode()
-        msg  = json.loads(data)
+        while True:
+            msg = recv_msg(conn)
+            if msg is None:
+                break
+            if msg.get("type") == "HELLO":
+                hello = answer_hello(msg)
+                send_msg(conn, hello)
+                fmt = {"codec": hello["codec"], "compress": hello["compress"]}
+                continue
+            handle_message(msg, lambda m: send_msg(conn, m, **fmt), addr)
+    except Exception as e:
+        print("[PEER] Error:", e)
+    finally:
+        conn.close()
+
+def start_peer_server_async(my_port):
+    """
+    Serve peer connections from a single asyncio event loop instead of a thread
+    per connection. Messages are handled in the loop's default executor.
 
-        if msg.get("type") == "UPDATE_PEERS":
-            peer_state["peers"] = msg["peers"]
+    Args:
+        my_port (int): Port number to bind the server to.
+    """
+    async def serve():
+        server = await asyncio.start_server(handle_peer_stream, "0.0.0.0", my_port)
+        print(f"[PEER] Listening on port {my_port} (asyncio)")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+async def handle_peer_stream(reader, writer):
+    """
+    Handle one peer connection on the event loop. Only framing and the HELLO
+    exchange run on the loop; each message is handled in the loop's default
+    executor, since handlers take the chain lock, write to disk and send to
+    other peers. Replies are written back through the loop, waiting for the
+    connection to drain, so a slow reader holds up only its own handler.
+
+    Args:
+        reader (asyncio.StreamReader): Incoming side of the connection.
+        writer (asyncio.StreamWriter): Outgoing side of the connection.
+    """
+    loop = asyncio.get_running_loop()
+    addr = writer.get_extra_info("peername")
+    fmt = {}
+
+    async def send(data):
+        writer.write(data)
+        await writer.drain()
+
+    def reply(m, fmt):
+        asyncio.run_coroutine_threadsafe(send(encode_msg(m, **fmt)), loop).result()
+
+    try:
+        while True:
+            msg = await read_msg(reader)
+            if msg is None:
+                break
+            if msg.get("type") == "HELLO":
+                hello = answer_hello(msg)
+                await send(encode_msg(hello))
+                fmt = {"codec": hello["codec"], "compress": hello["compress"]}
+                continue
+            await loop.run_in_executor(None, handle_message, msg,
+                                       lambda m, fmt=fmt: reply(m, fmt), addr)
+    except Exception as e:
+        print("[PEER] Error:", e)
+    finally:
+        writer.close()
+
+def handle_message(msg, reply, addr):
+    """
+    Process a single message received from a peer.
+
+    Args:
+        msg (dict): The decoded message.
+        reply (callable): Sends a message back on the same connection.
+        addr (tuple): The address of the sender.
+    """
+    if msg.get("type") == "UPDATE_PEERS":
+        if apply_peer_update(msg):
             print("[PEER] Received updated peer list:", peer_state["peers"])
+
+    elif msg.get("type") == "NEIGHBOUR":
+        key = (addr[0], msg["port"])
+        inbound[key] = time.time()
+        inbound.move_to_end(key)
+        while len(inbound) > MAX_INBOUND:
+            inbound.popitem(last=False)
+
+    elif msg.get("type") == "INV":
+        wanted = [h for h in msg["hashes"] if want_block(h)]
+        if wanted:
+            pool.send(addr[0], msg["port"],
+                      {"type": "GETDATA", "hashes": wanted, "port": peer_state["port"]})
+
+    elif msg.get("type") == "GETDATA":
+        for h in msg["hashes"]:
+            b = block_map.get(h) or orphans.get(h)
+            if b is not None:
+                pool.send(addr[0], msg["port"],
+                          {"type": "NEW_BLOCK", "block": b, "port": peer_state["port"]})
+
+    elif msg.get("type") == "NEW_BLOCK":
+        block = msg["block"]
+        if block["hash"] in block_map:
             return
+        if validate_block(block):
+            accept_block(block, block_source(msg, addr))
+        else:
+            in_flight.pop(block["hash"], None)
 
-        if msg.get("type") == "NEW_BLOCK":
-            block = msg["block"]
-            h     = block["hash"]
-            prev  = block["prev_hash"]
+    elif msg.get("type") == "REQUEST_CHAIN":
+        for frame in chain_frames(requested_blocks(msg)):
+            reply(frame)
 
-            if h in block_map:
-                return
+    elif msg.get("type") == "GET_HEADERS":
+        headers = chain_state.snapshot()[msg.get("from_index", 0):]
+        for i in range(0, max(len(headers), 1), HEADER_BATCH):
+            reply({"type": "HEADERS",
+                   "headers": [block_header(b) for b in headers[i:i+HEADER_BATCH]],
+                   "done": i + HEADER_BATCH >= len(headers)})
 
-            def compute_merkle(tx_list):
-                tx_hashes = [hashlib.sha256(json.dumps(tx, sort_keys=True).encode()).hexdigest()
-                             for tx in tx_list]
-                while len(tx_hashes) > 1:
-                    nl = []
-                    for i in range(0, len(tx_hashes), 2):
-                        L = tx_hashes[i]
-                        R = tx_hashes[i+1] if i+1 < len(tx_hashes) else L
-                        nl.append(hashlib.sha256((L+R).encode()).hexdigest())
-                    tx_hashes = nl
-                return tx_hashes[0] if tx_hashes else ''
-            
-            if compute_merkle(block["transactions"]) != block["merkle_root"]:
-                print("[PEER] Invalid Merkle root — rejecting", h[:6])
-                return
+    elif msg.get("type") == "BLOCK":
+        # Blocks from a RESPONSE_CHAIN stream pushed to us unsolicited.
+        b = msg["block"]
+        if b["hash"] not in block_map and validate_block(b):
+            with chain_state.lock:
+                if store_block(b):
+                    resolve_chain(b["hash"])
 
-            hdr = f'{block["index"]}{prev}{block["merkle_root"]}{block["timestamp"]}{block["nonce"]}'
-            if hashlib.sha256(hdr.encode()).hexdigest() != h \
-               or not h.startswith("0"*block["difficulty"]):
-                print("[PEER] Invalid PoW — rejecting", h[:6])
-                return
+def validate_block(block):
+    """
+    Check a block's Merkle root and proof-of-work. Does not touch chain state,
+    so it is safe to run off the main thread or event loop.
 
-            if prev != "0"*64 and prev not in block_map:
-                orphans[h] = block
-                print(f"[PEER] Received orphan {h[:6]}…")
-                return
+    Args:
+        block (dict): The block to validate.
+
+    Returns:
+        bool: True if the block is valid.
+    """
+    h = block["hash"]
+    if merkle_root(block["transactions"]) != block["merkle_root"]:
+        print("[PEER] Invalid Merkle root — rejecting", h[:6])
+        return False
+    if not check_pow(block):
+        print("[PEER] Invalid PoW — rejecting", h[:6])
+        return False
+    if VERIFY_SIGNATURES and not check_signatures([block]):
+        print("[PEER] Invalid signature — rejecting", h[:6])
+        return False
+    return True
+
+def check_signatures(blocks):
+    """
+    Verify every transaction signature in a list of blocks as one batch.
+
+    Args:
+        blocks (list): Blocks to check.
 
-            parent_cd = block_map.get(prev, {}).get("cum_diff", 0)
-            block["cum_diff"] = parent_cd + block["difficulty"]
+    Returns:
+        bool: True if every signature is valid.
+    """
+    return all(verify_transactions([tx for b in blocks for tx in b["transactions"]]))
+
+def check_pow(header):
+    """
+    Check that a block header hashes to its claimed hash and meets its difficulty
+    and, for numeric-target blocks, its target.
+
+    Args:
+        header (dict): A block or block header.
+
+    Returns:
+        bool: True if the proof-of-work is valid.
+    """
+    h = header["hash"]
+    hdr = f'{header["index"]}{header["prev_hash"]}{header["merkle_root"]}{header["timestamp"]}'
+    if "target" in header:
+        hdr += header["target"]
+    hdr += str(header["nonce"])
+    return hashlib.sha256(hdr.encode()).hexdigest() == h \
+        and h.startswith("0"*header["difficulty"]) \
+        and int(h, 16) <= block_target(header)
+
+def block_target(block):
+    """
+    Return the numeric target a block was mined against.
+
+    Args:
+        block (dict): A block or block header.
+
+    Returns:
+        int: Its "target", or the target equivalent to its difficulty.
+    """
+    if "target" in block:
+        return int(block["target"], 16)
+    return difficulty_to_target(block["difficulty"])
 
-            block_map[h] = block
-            child_to_parent[h] = prev
+def block_work(block):
+    """
+    Return the expected number of hashes it took to mine a block.
+
+    Args:
+        block (dict): A block or block header.
+
+    Returns:
+        int: The work implied by its target.
+    """
+    return target_work(block_target(block))
+
+def block_header(block):
+    """
+    Strip a block down to the header fields used by headers-first sync.
+
+    Args:
+        block (dict): The block.
+
+    Returns:
+        dict: The header.
+    """
+    return {k: block[k] for k in HEADER_FIELDS if k in block}
+
+def get_block(h):
+    """
+    Look up any known block by hash.
+
+    Args:
+        h (str): Block hash.
+
+    Returns:
+        dict or None: The block, if known.
+    """
+    return block_map.get(h)
+
+def requested_blocks(msg):
+    """
+    Select the active-chain blocks asked for by a REQUEST_CHAIN message.
+
+    Args:
+        msg (dict): Message with "from_index" and optional "to_index" (exclusive).
+
+    Returns:
+        list: The requested blocks.
+    """
+    return chain_state.snapshot()[msg.get("from_index", 0):msg.get("to_index")]
+
+def block_source(msg, addr):
+    """
+    Work out which peer a NEW_BLOCK can be followed up with.
+
+    Args:
+        msg (dict): The NEW_BLOCK message.
+        addr (tuple): The address the message arrived from.
+
+    Returns:
+        tuple or None: (ip, listening port) of the sender, if it told us its port.
+    """
+    return (addr[0], msg["port"]) if msg.get("port") else None
+
+def accept_block(block, source=None):
+    """
+    Store a validated block, update the chain and announce it to other peers.
+    Blocks with an unknown parent go to the orphan pool and the parent is
+    requested from the peer that sent them. Chain changes run under the chain
+    lock, so concurrent arrivals are applied one at a time; network sends
+    happen after it is released, so a slow peer cannot hold up other writers.
+
+    Args:
+        block (dict): The validated block.
+        source (tuple, optional): (ip, port) of the sending peer. Defaults to None.
+    """
+    h    = block["hash"]
+    prev = block["prev_hash"]
+    in_flight.pop(h, None)
+    with chain_state.lock:
+        if store_block(block):
             resolve_chain(h)
-            broadcast_to_peers(msg)
-            unblock_orphans(h)
+            accepted = [h] + unblock_orphans(h)
+        else:
+            accepted = []
+            new_orphan = orphans.add(block, source)
 
-        elif msg.get("type") == "REQUEST_CHAIN":
-            idx = msg.get("from_index", 0)
-            blks = [b for b in peer_state["blockchain"] if b["index"] >= idx]
-            conn.sendall(json.dumps({"type":"RESPONSE_CHAIN","blocks":blks}).encode())
+    if not accepted:
+        if new_orphan:
+            print(f"[PEER] Received orphan {h[:6]}…")
+        if new_orphan and source is not None and want_block(prev):
+            pool.send(source[0], source[1],
+                      {"type": "GETDATA", "hashes": [prev], "port": peer_state["port"]})
+        return
+    for a in accepted:
+        announce_block(a)
 
-        elif msg.get("type") == "RESPONSE_CHAIN":
-            for b in msg["blocks"]:
-                block_map[b["hash"]] = b
-                child_to_parent[b["hash"]] = b["prev_hash"]
-            if msg["blocks"]:
-                resolve_chain(msg["blocks"][-1]["hash"])
+def store_block(block):
+    """
+    Add a block whose parent is known to block_map, recording its height and
+    cumulative work so fork choice never has to walk the chain to compute them.
 
-    except Exception as e:
-        print("[PEER] Error:", e)
-    finally:
-        conn.close()
+    Args:
+        block (dict): The block to store.
+
+    Returns:
+        bool: False if the parent is unknown (the block is an orphan), else True.
+    """
+    with chain_state.lock:
+        prev = block["prev_hash"]
+        if prev == "0"*64:
+            parent_work, height = 0, 0
+        elif prev in block_map:
+            parent = block_map[prev]
+            parent_work, height = parent["cum_work"], parent["height"] + 1
+        else:
+            return False
+        block["cum_work"] = parent_work + block_work(block)
+        block["height"] = height
+        block_map[block["hash"]] = block
+        return True
 
 def broadcast_to_peers(msg):
     """
-    Broadcast a message to all known peers.
+    Broadcast a message to our neighbours over pooled, long-lived connections.
+    Peers that accept a block announce it to their own neighbours, so it
+    reaches the whole network by relay.
 
     Args:
         msg (dict): Message to send.
     """
-    for p in peer_state["peers"]:
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((p["ip"], p["port"]))
-            s.sendall(json.dumps(msg).encode())
-            s.close()
-        except:
-            pass
+    pool.broadcast(neighbours(), msg)
+
+def want_block(h):
+    """
+    Decide whether to request a block announced in an INV, marking it as in flight if so.
+    Requests older than GETDATA_TIMEOUT are forgotten here, and at most
+    MAX_IN_FLIGHT are remembered, so announcements of blocks that never
+    arrive cannot grow the table without bound.
+
+    Args:
+        h (str): The announced block hash.
+
+    Returns:
+        bool: True if the block is unknown and not already being fetched.
+    """
+    if h in block_map or h in orphans:
+        return False
+    now = time.time()
+    with in_flight_lock:
+        while in_flight:
+            oldest, sent = next(iter(in_flight.items()))
+            if now - sent < GETDATA_TIMEOUT and len(in_flight) < MAX_IN_FLIGHT:
+                break
+            del in_flight[oldest]
+        if h in in_flight:
+            return False
+        in_flight[h] = now
+        return True
+
+def announce_block(h):
+    """
+    Announce a block hash to our neighbours. Peers that do not have the block fetch
+    its body with GETDATA, so each peer downloads it once.
+
+    Args:
+        h (str): Hash of the block to announce.
+    """
+    broadcast_to_peers({"type": "INV", "hashes": [h], "port": peer_state["port"]})
 
 def mine_block():
     """
     Attempt to mine a new block from the mempool and propagate it.
+
+    If resolve_chain() switches to a new tip while mining, the attempt is aborted
+    and restarted on top of the new tip with the transactions it did not confirm.
+    Transactions leave the mempool when resolve_chain() connects the block
+    that confirms them.
     """
-    if not mempool:
+    while mempool:
+        # Clear before reading the tip so a switch after this point always aborts us.
+        mining_abort.clear()
+        chain = chain_state.snapshot()
+        prev = chain[-1] if chain else None
+        prev_hash = prev["hash"] if prev else "0"*64
+        idx = prev["index"]+1 if prev else 0
+
+        if TARGET_MODE:
+            target = adjust_target(chain)
+            difficulty = target_to_difficulty(target)
+        else:
+            target, difficulty = None, adjust_difficulty(chain)
+        blk = Block(idx, prev_hash, mempool.take(MAX_BLOCK_TXS), difficulty, target)
+        goal = f"target={target:064x}" if TARGET_MODE else f"diff={difficulty}"
+        print(f"[MINER] Mining #{idx} ({goal}, workers={MINING_WORKERS})…")
+        start = time.time()
+        hashes = blk.mine(MINING_WORKERS, mining_abort)
+        if hashes is not None:
+            break
+        print(f"[MINER] Tip changed — abandoning #{idx} and rebuilding template")
+    else:
         return
-    prev = peer_state["blockchain"][-1] if peer_state["blockchain"] else None
-    prev_hash = prev["hash"] if prev else "0"*64
-    idx = prev["index"]+1 if prev else 0
-
-    difficulty = adjust_difficulty(peer_state["blockchain"])
-    blk = Block(idx, prev_hash, mempool[:], difficulty)
-    print(f"[MINER] Mining #{idx} (diff={difficulty})…")
-    blk.mine()
-    print(f"[MINER] Mined block #{idx}: {blk.hash}")
-
-    bd = {
-        "index": blk.index,
-        "timestamp": blk.timestamp,
-        "prev_hash": blk.prev_hash,
-        "transactions": [tx.to_dict() for tx in blk.transactions],
-        "difficulty": blk.difficulty,
-        "nonce": blk.nonce,
-        "merkle_root": blk.merkle_root,
-        "hash": blk.hash,
-        "cum_diff": 0
-    }
-
-    block_map[bd["hash"]] = bd
-    child_to_parent[bd["hash"]] = bd["prev_hash"]
+    peer_state["hashrate"] = hashrate(hashes, time.time() - start)
+    print(f"[MINER] Mined block #{idx}: {blk.hash} ({peer_state['hashrate']})")
+
+    bd = blk.to_dict()
+
+    store_block(bd)
     resolve_chain(bd["hash"])
-    broadcast_to_peers({"type":"NEW_BLOCK","block":bd})
-    mempool[:] = [tx for tx in mempool if tx.to_dict() not in bd["transactions"]]
+    announce_block(bd["hash"])
 
 def miner_loop():
     """
-    Background loop to periodically mine blocks.
+    Background loop that mines a block whenever MAX_BLOCK_TXS transactions are
+    pending or the oldest has waited MAX_BLOCK_WAIT seconds.
     """
     while True:
-        time.sleep(60)
+        mempool.wait_for_batch(MAX_BLOCK_TXS, MAX_BLOCK_WAIT)
         mine_block()
 
+def tx_status(txid):
+    """
+    Report where a transaction is: pending in the mempool or confirmed on the active chain.
+
+    Args:
+        txid (str): Transaction ID.
+
+    Returns:
+        dict or None: {"status": "pending"}, or {"status": "confirmed", "block_index",
+            "block_hash", "confirmations"}; None if the transaction is unknown.
+    """
+    chain_ready.wait()
+    loc = chain_index.locate(txid)
+    chain = chain_state.snapshot()
+    if loc is not None and loc[0] < len(chain):
+        height = loc[0]
+        return {"status": "confirmed", "block_index": height,
+                "block_hash": chain[height]["hash"], "confirmations": len(chain) - height}
+    if txid in mempool:
+        return {"status": "pending"}
+    return None
+
+def record_decision(block_hash, tx_index, signature):
+    """
+    Record a supervisor's decision on a shift on the active chain. Blocks stay
+    exactly as they were mined, so their Merkle proofs and validation on other
+    peers are unaffected; the decision is laid over the shift when it is served.
+
+    Args:
+        block_hash (str): Hash of the block holding the shift.
+        tx_index (int): Position of the shift in the block.
+        signature (str): The supervisor's signature or decision.
+
+    Returns:
+        dict or None: The shift with the decision applied, or None if it is not on the active chain.
+    """
+    chain_ready.wait()
+    height = chain_index.height_of(block_hash)
+    chain = chain_state.snapshot()
+    if height is None or height >= len(chain) or chain[height]["hash"] != block_hash:
+        return None
+    block = chain[height]
+    if not isinstance(tx_index, int) or not 0 <= tx_index < len(block["transactions"]):
+        return None
+    approvals.record(block_hash, tx_index, signature)
+    return approvals.transaction(block, tx_index)
+
 def resolve_chain(tip_hash):
     """
-    Resolve the best blockchain based on cumulative difficulty.
+    Switch to the chain ending at `tip_hash` if it has more cumulative work
+    than the active chain. Tips are compared using the cumulative work cached
+    in block_map, and a reorg only walks back to the common ancestor.
 
     Args:
-        tip_hash (str): The hash of the current tip block.
+        tip_hash (str): The hash of the candidate tip block.
+
+    Returns:
+        tuple or None: (connected, disconnected) lists of blocks if the active chain
+            changed, else None.
     """
-    new_chain = []
-    cur = tip_hash
-    seen = set()
-    while cur != "0"*64 and cur in block_map and cur not in seen:
-        seen.add(cur)
-        new_chain.append(block_map[cur])
-        cur = block_map[cur]["prev_hash"]
-    new_chain.reverse()
+    with chain_state.lock:
+        tip = block_map.get(tip_hash)
+        chain = chain_state.snapshot()
+        if tip is None or (chain and tip["cum_work"] <= chain[-1]["cum_work"]):
+            return None
+
+        def on_active_chain(b):
+            return b["height"] < len(chain) and chain[b["height"]]["hash"] == b["hash"]
 
-    new_cd = sum(b["difficulty"] for b in new_chain)
-    old_cd = sum(b["difficulty"] for b in peer_state["blockchain"])
-    if new_cd > old_cd:
-        peer_state["blockchain"] = new_chain
-        print(f"[PEER] Switched to chain (cum-diff={new_cd})")
+        branch = []
+        cur = tip
+        while cur is not None and not on_active_chain(cur):
+            branch.append(cur)
+            cur = block_map.get(cur["prev_hash"])
+        fork_height = cur["height"] if cur is not None else -1
+
+        branch.reverse()
+        disconnected = chain_state.switch(fork_height, branch)
+        if block_store is not None:
+            block_store.set_active(fork_height, branch)
+        for listener in chain_listeners:
+            listener(branch, disconnected)
+        mining_abort.set()
+        if disconnected:
+            print(f"[PEER] Reorg: rolled back {len(disconnected)} block(s) to height {fork_height}")
+        print(f"[PEER] Switched to chain (cum-work={tip['cum_work']})")
+        return branch, disconnected
 
 def unblock_orphans(parent_hash):
     """
-    Attempt to reintegrate any orphaned blocks that now have a known parent.
+    Reintegrate orphaned blocks that now have a known parent, following
+    chains of orphans iteratively. The caller announces them.
 
     Args:
         parent_hash (str): The hash of the newly accepted block.
+
+    Returns:
+        list: Hashes of the reintegrated blocks, in the order they were stored.
     """
-    for h, b in list(orphans.items()):
-        if b["prev_hash"] == parent_hash:
-            del orphans[h]
+    pending, reintegrated = [parent_hash], []
+    while pending:
+        for b, _ in orphans.pop_children(pending.pop()):
+            h = b["hash"]
             print(f"[PEER] Reintegrating orphan {h[:6]}…")
-            block_map[h] = b
-            child_to_parent[h] = b["prev_hash"]
+            store_block(b)
             resolve_chain(h)
-            broadcast_to_peers({"type":"NEW_BLOCK","block":b})
-            unblock_orphans(h)
+            reintegrated.append(h)
+            pending.append(h)
+    return reintegrated
+
+def ingest_chain(conn, header):
+    """
+    Validate and store the blocks of a streamed RESPONSE_CHAIN as they arrive and
+    resolve the chain. The stream is abandoned at the first invalid block; the
+    blocks before it are kept.
+
+    Args:
+        conn (socket): Socket positioned after the RESPONSE_CHAIN header.
+        header (dict): The RESPONSE_CHAIN header frame.
+    """
+    last = None
+    for b in iter_chain(conn, header):
+        if b["hash"] in block_map:
+            last = b["hash"]
+        elif not validate_block(b):
+            break
+        elif store_block(b):
+            last = b["hash"]
+        else:
+            orphans.add(b)
+    if last is not None:
+        resolve_chain(last)
+
+def fetch_headers(p):
+    """
+    Download a peer's header chain.
+
+    Args:
+        p (dict): Peer with "ip" and "port".
+
+    Returns:
+        list: Headers from height 0 to the peer's tip.
+    """
+    s = socket.create_connection((p["ip"], p["port"]), timeout=SYNC_TIMEOUT)
+    try:
+        negotiate(s, compress=True)
+        send_msg(s, {"type": "GET_HEADERS", "from_index": 0})
+        headers = []
+        while True:
+            msg = recv_msg(s)
+            if msg is None or msg.get("type") != "HEADERS":
+                raise ConnectionError("header stream ended early")
+            headers.extend(msg["headers"])
+            if msg.get("done"):
+                return headers
+    finally:
+        s.close()
+
+def verify_headers(headers):
+    """
+    Check that headers link from genesis and each carries valid proof-of-work.
+
+    Args:
+        headers (list): Headers in height order.
+
+    Returns:
+        int or None: Cumulative work of the header chain, or None if invalid.
+    """
+    prev, cum_work = "0"*64, 0
+    for hd in headers:
+        if hd["prev_hash"] != prev or not check_pow(hd):
+            return None
+        prev = hd["hash"]
+        cum_work += block_work(hd)
+    return cum_work
+
+def fetch_bodies(p, headers, start, end):
+    """
+    Download the blocks for heights [start, end) from one peer and check each
+    against its already-verified header.
+
+    Args:
+        p (dict): Peer with "ip" and "port".
+        headers (list): The verified header chain.
+        start (int): First height to fetch.
+        end (int): Height after the last one to fetch.
+
+    Returns:
+        list: The blocks, in height order.
+
+    Raises:
+        ValueError: If a body does not match its header or the range is incomplete.
+    """
+    s = socket.create_connection((p["ip"], p["port"]), timeout=SYNC_TIMEOUT)
+    try:
+        negotiate(s, compress=True)
+        send_msg(s, {"type": "REQUEST_CHAIN", "from_index": start, "to_index": end})
+        blocks = []
+        for b in iter_chain(s, recv_msg(s)):
+            hd = headers[start + len(blocks)]
+            # block_header() omits fields a block does not have, e.g. "target" in difficulty mode.
+            if any(b.get(k) != hd.get(k) for k in HEADER_FIELDS) \
+               or merkle_root(b["transactions"]) != hd["merkle_root"]:
+                raise ValueError(f"body {b['hash'][:6]} does not match its header")
+            blocks.append(b)
+        if len(blocks) != end - start:
+            raise ValueError(f"expected {end - start} blocks, got {len(blocks)}")
+        if VERIFY_SIGNATURES and not check_signatures(blocks):
+            raise ValueError(f"invalid signature in blocks {start}-{end}")
+        return blocks
+    finally:
+        s.close()
+
+def sync_headers_first(my_port):
+    """
+    Download and verify every peer's header chain, pick the one with the most
+    cumulative work, then fetch the missing block bodies in ranges from
+    all peers serving that chain in parallel.
+
+    Args:
+        my_port (int): This peer's port number.
+
+    Returns:
+        bool: True if the sync completed (or there was nothing newer to fetch).
+    """
+    others = [p for p in peer_state["peers"] if p["port"] != my_port]
+    if not others:
+        return False
+
+    def try_headers(p):
+        try:
+            return fetch_headers(p)
+        except Exception as e:
+            print(f"[SYNC] No headers from {p['ip']}:{p['port']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(others)) as ex:
+        results = list(ex.map(try_headers, others))
+    candidates = []
+    for p, headers in zip(others, results):
+        cum_work = verify_headers(headers) if headers else None
+        if cum_work is not None:
+            candidates.append((cum_work, p, headers))
+    if not candidates:
+        return False
+
+    best_work, _, headers = max(candidates, key=lambda c: c[0])
+    tip = chain_state.tip()
+    if not headers or (tip and best_work <= tip["cum_work"]):
+        return True
+    tip = headers[-1]["hash"]
+    sources = [p for _, p, h in candidates if h[-1]["hash"] == tip]
+
+    start = 0
+    while start < len(headers) and headers[start]["hash"] in block_map:
+        start += 1
+    ranges = [(a, min(a + BODY_RANGE, len(headers)))
+              for a in range(start, len(headers), BODY_RANGE)]
+
+    def download(job):
+        k, (a, b) = job
+        for attempt in range(len(sources)):
+            p = sources[(k + attempt) % len(sources)]
+            try:
+                return fetch_bodies(p, headers, a, b)
+            except Exception as e:
+                print(f"[SYNC] Range {a}-{b} from {p['ip']}:{p['port']} failed: {e}")
+        raise ConnectionError(f"no peer served blocks {a}-{b}")
+
+    with ThreadPoolExecutor(max_workers=len(sources)) as ex:
+        for blocks in ex.map(download, enumerate(ranges)):
+            for b in blocks:
+                if b["hash"] not in block_map:
+                    store_block(b)
+    resolve_chain(tip)
+    print(f"[SYNC] Headers-first sync: {len(headers)} headers, "
+          f"{len(headers) - start} bodies from {len(sources)} peer(s)")
+    return True
 
 def sync_chain_on_startup(my_port):
     """
-    Synchronize the blockchain on peer startup by requesting the chain from another peer.
+    Synchronize the blockchain on peer startup, headers-first when enabled, falling
+    back to requesting the whole chain from one peer.
 
     Args:
         my_port (int): This peer's port number.
     """
     time.sleep(2)
+    if HEADERS_FIRST_SYNC:
+        try:
+            if sync_headers_first(my_port):
+                return
+        except Exception as e:
+            print("[SYNC] Headers-first sync failed:", e)
     for p in peer_state["peers"]:
         if p["port"] == my_port:
             continue
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             s.connect((p["ip"], p["port"]))
-            s.sendall(json.dumps({"type":"REQUEST_CHAIN","from_index":0}).encode())
-            resp = json.loads(s.recv(65536).decode())
-            for b in resp.get("blocks", []):
-                block_map[b["hash"]] = b
-                child_to_parent[b["hash"]] = b["prev_hash"]
-            if resp.get("blocks"):
-                resolve_chain(resp["blocks"][-1]["hash"])
+            negotiate(s, compress=True)
+            send_msg(s, {"type":"REQUEST_CHAIN","from_index":0})
+            ingest_chain(s, recv_msg(s))
             s.close()
             break
         except:
             continue
 
-def run_peer(my_port, tracker_ip, tracker_port):
+def open_block_store(data_dir):
+    """
+    Persist blocks and supervisor decisions under `data_dir` and take the
+    active chain from what is already there. Only the chain's record offsets
+    are loaded, so this takes milliseconds however long the chain is.
+
+    The chain listeners (indexes, mempool, anomaly detector) are then brought
+    up to date with the stored chain in the background, holding the chain
+    lock so no block is connected before they have caught up. Lookups that
+    depend on them wait for `chain_ready`.
+
+    Args:
+        data_dir (str): Directory for the block store files.
+    """
+    global block_map, block_store
+    start = time.time()
+    block_store = BlockStore(data_dir)
+    block_map = BlockMap(block_store)
+    approvals.open(os.path.join(data_dir, "approvals.log"))
+    chain_state.use_store(block_store)
+    print(f"[PEER] Loaded {len(chain_state)} blocks from {data_dir} "
+          f"in {(time.time() - start) * 1000:.1f} ms")
+
+    chain_ready.clear()
+    locked = threading.Event()
+
+    def index_stored_chain():
+        with chain_state.lock:
+            locked.set()
+            for listener in chain_listeners:
+                listener(chain_state.snapshot(), [])
+            chain_ready.set()
+        print(f"[PEER] Indexed {len(chain_state)} stored blocks "
+              f"in {(time.time() - start) * 1000:.1f} ms")
+
+    threading.Thread(target=index_stored_chain, daemon=True).start()
+    locked.wait()
+
+def run_peer(my_port, tracker_ip, tracker_port, workers=1, use_asyncio=False, data_dir=None,
+             target_mode=False):
     """
     Launch a peer node, register with the tracker, and start all threads.
 
@@ -338,11 +1057,25 @@ def run_peer(my_port, tracker_ip, tracker_port):
         my_port (int): This peer's port number.
         tracker_ip (str): Tracker IP address.
         tracker_port (int): Tracker port.
+        workers (int, optional): Number of mining processes. Defaults to 1.
+        use_asyncio (bool, optional): Serve peers from an asyncio event loop instead
+            of a thread per connection. Defaults to False.
+        data_dir (str, optional): Directory for the on-disk block store. Defaults to
+            None, which keeps the chain in memory only.
+        target_mode (bool, optional): Mine against a numeric target instead of
+            leading hex zeros. Defaults to False.
     """
+    global MINING_WORKERS, TARGET_MODE
+    MINING_WORKERS = workers
+    TARGET_MODE = target_mode
+    peer_state["port"] = my_port
+    if data_dir:
+        open_block_store(data_dir)
     register_with_tracker(tracker_ip, tracker_port, my_port)
     threading.Thread(target=periodically_refresh_peers, args=(tracker_ip, tracker_port), daemon=True).start()
     threading.Thread(target=send_heartbeat, args=(tracker_ip, tracker_port, my_port), daemon=True).start()
-    threading.Thread(target=start_peer_server, args=(my_port,), daemon=True).start()
+    server = start_peer_server_async if use_asyncio else start_peer_server
+    threading.Thread(target=server, args=(my_port,), daemon=True).start()
     threading.Thread(target=miner_loop, daemon=True).start()
     threading.Thread(target=sync_chain_on_startup, args=(my_port,), daemon=True).start()
 
@@ -351,7 +1084,17 @@ def run_peer(my_port, tracker_ip, tracker_port):
         time.sleep(60)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python peer.py <port> <tracker_ip> <tracker_port>")
+    use_asyncio = "--asyncio" in sys.argv
+    target_mode = "--target-mode" in sys.argv
+    args = [a for a in sys.argv if a not in ("--asyncio", "--target-mode")]
+    data_dir = None
+    if "--data-dir" in args:
+        i = args.index("--data-dir")
+        data_dir = args[i+1]
+        del args[i:i+2]
+    if len(args) not in (4, 5):
+        print("Usage: python peer.py <port> <tracker_ip> <tracker_port> [<mining_workers>] [--asyncio] [--target-mode] [--data-dir <dir>]")
         sys.exit(1)
-    run_peer(int(sys.argv[1]), sys.argv[2], int(sys.argv[3]))
+    workers = int(args[4]) if len(args) == 5 else 1
+    run_peer(int(args[1]), args[2], int(args[3]), workers, use_asyncio,
+             data_dir or f"data/{args[1]}", target_mode)
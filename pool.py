@@ -0,0 +1,366 @@
+# pool.py
+
+import asyncio
+import queue
+import socket
+import threading
+import time
+from wire import JSON, encode_msg, negotiate
+
+QUEUE_SIZE    = 256     # messages buffered per peer before senders block
+SEND_TIMEOUT  = 2       # seconds a sender waits on a full queue before dropping
+CONNECT_TIMEOUT = 3     # seconds allowed for a TCP connect
+MAX_RETRIES   = 3       # attempts to deliver a message before dropping it
+MAX_BACKOFF   = 8       # upper bound in seconds on the reconnect delay
+
+class Outgoing:
+    """
+    A message queued for one or more peers, encoded at most once per codec.
+    """
+    def __init__(self, msg):
+        """
+        Args:
+            msg (dict): Message to send.
+        """
+        self.msg = msg
+        self._frames = {}
+
+    def frame(self, codec):
+        """
+        Return the encoded frame for a codec, encoding it on first use.
+
+        Args:
+            codec (str): Codec negotiated with the receiving peer.
+
+        Returns:
+            bytes: The frame.
+        """
+        frame = self._frames.get(codec)
+        if frame is None:
+            frame = self._frames[codec] = encode_msg(self.msg, codec)
+        return frame
+
+class PeerConnection:
+    """
+    A long-lived outbound connection to one peer with its own send queue and writer thread.
+    """
+    def __init__(self, ip, port, queue_size=QUEUE_SIZE):
+        """
+        Create the connection and start its writer thread. The socket itself is
+        opened lazily on the first send.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+            queue_size (int, optional): Messages buffered before senders block. Defaults to QUEUE_SIZE.
+        """
+        self.ip = ip
+        self.port = port
+        self.queue = queue.Queue(queue_size)
+        self.sock = None
+        self.codec = JSON
+        self.backoff = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def send(self, item, timeout=SEND_TIMEOUT):
+        """
+        Queue a message for delivery, blocking while the queue is full.
+
+        Args:
+            item (Outgoing): The message to send.
+            timeout (float, optional): Seconds to wait for queue space. Defaults to SEND_TIMEOUT.
+
+        Returns:
+            bool: True if queued, False if dropped because the peer is not keeping up.
+        """
+        try:
+            self.queue.put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            print(f"[POOL] Send queue full for {self.ip}:{self.port} — dropping message")
+            return False
+
+    def close(self):
+        """
+        Stop the writer thread once queued messages are flushed.
+        """
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _connect(self):
+        """
+        Open the TCP connection, waiting out the current backoff first, and
+        negotiate the codec with a HELLO exchange.
+        """
+        if self.backoff:
+            time.sleep(self.backoff)
+        s = socket.create_connection((self.ip, self.port), timeout=CONNECT_TIMEOUT)
+        s.settimeout(None)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.sock = s
+        self.codec = negotiate(s)
+
+    def _drop_socket(self):
+        """
+        Close a failed socket and increase the reconnect backoff.
+        """
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.backoff = min(MAX_BACKOFF, (self.backoff or 0.25) * 2)
+
+    def _run(self):
+        """
+        Writer loop: deliver queued messages in order, reconnecting on failure.
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            for _ in range(MAX_RETRIES):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall(item.frame(self.codec))
+                    self.backoff = 0
+                    break
+                except OSError:
+                    self._drop_socket()
+        if self.sock is not None:
+            self.sock.close()
+
+class ConnectionPool:
+    """
+    Reusable outbound connections keyed by (ip, port).
+    """
+    def __init__(self):
+        """
+        Create an empty pool.
+        """
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    def _get(self, ip, port):
+        """
+        Return the connection for a peer, creating it on first use.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+
+        Returns:
+            PeerConnection: The connection.
+        """
+        with self._lock:
+            conn = self._conns.get((ip, port))
+            if conn is None:
+                conn = self._conns[(ip, port)] = PeerConnection(ip, port)
+            return conn
+
+    def send(self, ip, port, msg):
+        """
+        Send one message to a single peer.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+            msg (dict): Message to send.
+
+        Returns:
+            bool: True if the message was queued.
+        """
+        return self._get(ip, port).send(Outgoing(msg))
+
+    def broadcast(self, peers, msg):
+        """
+        Send one message to every peer in a list, encoding it only once per codec.
+
+        Args:
+            peers (list): Peer dicts with "ip" and "port" keys.
+            msg (dict): Message to send.
+        """
+        item = Outgoing(msg)
+        for p in peers:
+            self._get(p["ip"], p["port"]).send(item)
+
+    def drop(self, ip, port):
+        """
+        Close the connection to one peer, if open.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+        """
+        with self._lock:
+            conn = self._conns.pop((ip, port), None)
+        if conn is not None:
+            conn.close()
+
+    def retain(self, peers):
+        """
+        Close connections to peers that are no longer in the given list.
+
+        Args:
+            peers (list): Peer dicts with "ip" and "port" keys.
+        """
+        keep = {(p["ip"], p["port"]) for p in peers}
+        with self._lock:
+            for key in [k for k in self._conns if k not in keep]:
+                self._conns.pop(key).close()
+
+class AsyncPeerConnection:
+    """
+    A long-lived outbound connection to one peer, written from an asyncio event
+    loop by a task instead of a thread. Frames are sent as they were encoded,
+    without a codec handshake.
+    """
+    def __init__(self, ip, port, queue_size=QUEUE_SIZE):
+        """
+        Create the connection and start its writer task. Call on the event loop;
+        the connection itself is opened on the first send.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+            queue_size (int, optional): Frames buffered before new ones are dropped. Defaults to QUEUE_SIZE.
+        """
+        self.ip = ip
+        self.port = port
+        self.queue = asyncio.Queue(queue_size)
+        self.writer = None
+        self.backoff = 0
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, frame):
+        """
+        Queue a frame for delivery. The event loop cannot block, so a full queue
+        drops the frame at once.
+
+        Args:
+            frame (bytes): The encoded message.
+
+        Returns:
+            bool: True if queued, False if dropped because the peer is not keeping up.
+        """
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            print(f"[POOL] Send queue full for {self.ip}:{self.port} — dropping message")
+            return False
+
+    def close(self):
+        """
+        Stop the writer task once queued frames are flushed.
+        """
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            self.task.cancel()
+
+    async def _connect(self):
+        """
+        Open the TCP connection, waiting out the current backoff first.
+        """
+        if self.backoff:
+            await asyncio.sleep(self.backoff)
+        _, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip, self.port), CONNECT_TIMEOUT)
+
+    def _drop_socket(self):
+        """
+        Close a failed connection and increase the reconnect backoff.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        self.writer = None
+        self.backoff = min(MAX_BACKOFF, (self.backoff or 0.25) * 2)
+
+    async def _run(self):
+        """
+        Writer loop: deliver queued frames in order, reconnecting on failure.
+        """
+        while True:
+            frame = await self.queue.get()
+            if frame is None:
+                break
+            for _ in range(MAX_RETRIES):
+                try:
+                    if self.writer is None:
+                        await self._connect()
+                    self.writer.write(frame)
+                    await self.writer.drain()
+                    self.backoff = 0
+                    break
+                except (OSError, asyncio.TimeoutError):
+                    self._drop_socket()
+        if self.writer is not None:
+            self.writer.close()
+
+class AsyncConnectionPool:
+    """
+    Reusable outbound connections keyed by (ip, port), all driven by one asyncio
+    event loop instead of a writer thread per peer. Its methods may be called
+    from any thread: messages are encoded by the caller and handed to the loop.
+    """
+    def __init__(self, loop):
+        """
+        Create an empty pool.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The running loop that owns the connections.
+        """
+        self._loop = loop
+        self._conns = {}
+
+    def _get(self, key):
+        conn = self._conns.get(key)
+        if conn is None:
+            conn = self._conns[key] = AsyncPeerConnection(*key)
+        return conn
+
+    def _send(self, keys, frame):
+        for key in keys:
+            self._get(key).send(frame)
+
+    def send(self, ip, port, msg):
+        """
+        Send one message to a single peer.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+            msg (dict): Message to send.
+        """
+        self._loop.call_soon_threadsafe(self._send, [(ip, port)], encode_msg(msg))
+
+    def broadcast(self, peers, msg):
+        """
+        Send one message to every peer in a list, encoding it only once.
+
+        Args:
+            peers (list): Peer dicts with "ip" and "port" keys.
+            msg (dict): Message to send.
+        """
+        keys = [(p["ip"], p["port"]) for p in peers]
+        self._loop.call_soon_threadsafe(self._send, keys, encode_msg(msg))
+
+    def drop(self, ip, port):
+        """
+        Close the connection to one peer, if open.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+        """
+        self._loop.call_soon_threadsafe(self._drop, (ip, port))
+
+    def _drop(self, key):
+        conn = self._conns.pop(key, None)
+        if conn is not None:
+            conn.close()
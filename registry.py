@@ -0,0 +1,250 @@
+# registry.py
+
+import heapq
+import random
+import threading
+import time
+from collections import deque
+
+PEER_TTL = 30           # seconds without a heartbeat before a peer expires
+MAX_CHANGES = 10000     # membership changes remembered for delta updates
+
+class PeerRegistry:
+    """
+    The tracker's set of live peers, keyed by (ip, port). Expiry deadlines sit
+    in a min-heap so pruning only touches peers that are due, and every
+    membership change bumps a version number and is logged so peers can be
+    sent just what changed since the version they hold. Keys are also kept in
+    a list so random samples cost O(k) rather than O(peers).
+
+    The sample handed to each peer is remembered as its neighbour set, with
+    the reverse map of who holds whom, so a change is only pushed to the peers
+    it affects: the holders of a departed peer, and peers with room for a
+    newcomer.
+    """
+    def __init__(self, ttl=PEER_TTL, max_changes=MAX_CHANGES):
+        """
+        Create an empty registry.
+
+        Args:
+            ttl (int, optional): Seconds before a silent peer expires. Defaults to PEER_TTL.
+            max_changes (int, optional): Changes kept for delta updates. Defaults to MAX_CHANGES.
+        """
+        self.ttl = ttl
+        self.version = 0
+        self._peers = {}                            # (ip, port) -> last_seen
+        self._order = []                            # registered keys, for O(k) random sampling
+        self._pos = {}                              # (ip, port) -> index in _order
+        self._expiry = []                           # heap of (deadline, (ip, port)); stale entries skipped
+        self._changes = deque(maxlen=max_changes)   # (version, "joined"/"left", (ip, port), holders)
+        self._neighbours = {}                       # (ip, port) -> set of keys handed to it
+        self._holders = {}                          # (ip, port) -> set of keys it was handed to
+        self._wanted = {}                           # (ip, port) -> neighbours it asked for
+        self._room = set()                          # keys holding fewer neighbours than wanted
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._peers
+
+    def __len__(self):
+        return len(self._peers)
+
+    def join(self, ip, port):
+        """
+        Register a peer, or refresh it if already known.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+
+        Returns:
+            bool: True if the peer is new.
+        """
+        key = (ip, port)
+        with self._lock:
+            new = key not in self._peers
+            self._touch(key)
+            if new:
+                self._pos[key] = len(self._order)
+                self._order.append(key)
+                self._record("joined", key)
+            return new
+
+    def heartbeat(self, ip, port):
+        """
+        Record a heartbeat. A peer the registry has forgotten (for example after
+        expiring it) is registered again.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+
+        Returns:
+            bool: True if the peer had to be registered again.
+        """
+        return self.join(ip, port)
+
+    def leave(self, ip, port):
+        """
+        Remove a peer.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+
+        Returns:
+            bool: True if the peer was registered.
+        """
+        key = (ip, port)
+        with self._lock:
+            if key not in self._peers:
+                return False
+            self._drop(key)
+            return True
+
+    def expire(self, now=None):
+        """
+        Remove peers whose last heartbeat is older than the TTL.
+
+        Args:
+            now (float, optional): Current time. Defaults to time.time().
+
+        Returns:
+            list: (ip, port) of the peers removed.
+        """
+        now = time.time() if now is None else now
+        removed = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                deadline, key = heapq.heappop(self._expiry)
+                last_seen = self._peers.get(key)
+                if last_seen is not None and last_seen + self.ttl <= deadline:
+                    self._drop(key)
+                    removed.append(key)
+        return removed
+
+    def peers(self):
+        """
+        List every registered peer.
+
+        Returns:
+            tuple: (version, list of {"ip", "port"} dicts).
+        """
+        with self._lock:
+            return self.version, [{"ip": ip, "port": port} for ip, port in self._peers]
+
+    def sample(self, k, exclude=None, keep=()):
+        """
+        Pick up to k peers at random. Peers in `keep` that are still registered
+        come first, so a peer refreshing its neighbours keeps the live ones.
+        If the requester is registered, the sample becomes its neighbour set.
+
+        Args:
+            k (int): Number of peers wanted.
+            exclude (tuple, optional): (ip, port) never returned, normally the requester.
+            keep (iterable, optional): (ip, port) of peers to prefer. Defaults to ().
+
+        Returns:
+            tuple: (version, list of {"ip", "port"} dicts).
+        """
+        with self._lock:
+            chosen = []
+            for key in keep:
+                if key in self._peers and key != exclude and key not in chosen:
+                    chosen.append(key)
+            chosen = chosen[:k]
+            taken = set(chosen)
+            n = min(len(self._order), k + len(taken) + 1)
+            for key in random.sample(self._order, n):
+                if len(chosen) >= k:
+                    break
+                if key != exclude and key not in taken:
+                    chosen.append(key)
+            if exclude in self._peers:
+                self._unlink(exclude)
+                self._neighbours[exclude] = set(chosen)
+                self._wanted[exclude] = k
+                for key in chosen:
+                    self._holders.setdefault(key, set()).add(exclude)
+                self._check_room(exclude)
+            return self.version, [{"ip": ip, "port": port} for ip, port in chosen]
+
+    def updates_since(self, version):
+        """
+        Work out which peers the membership changes after a given version
+        affect. A departed peer is reported to the peers it was handed to, and
+        a new peer to those with room for it, as many as each has room for.
+        Newcomers sent to a peer are counted as its neighbours from then on.
+
+        Args:
+            version (int): Registry version before the changes.
+
+        Returns:
+            tuple or None: (current version, {(ip, port): (joined, left)}) with
+                lists of {"ip", "port"}, or None if the changes are no longer
+                all in the log.
+        """
+        with self._lock:
+            if version > self.version:
+                return None
+            if version < self.version and \
+               (not self._changes or self._changes[0][0] > version + 1):
+                return None
+            latest = {}
+            for v, kind, key, holders in reversed(self._changes):
+                if v <= version:
+                    break
+                latest.setdefault(key, (kind, holders))
+            updates = {}
+            for key, (kind, holders) in latest.items():
+                if kind == "left":
+                    for h in holders:
+                        if h in self._peers:
+                            updates.setdefault(h, ([], []))[1].append({"ip": key[0], "port": key[1]})
+            joined = [key for key, (kind, _) in latest.items()
+                      if kind == "joined" and key in self._peers]
+            for r in list(self._room) if joined else ():
+                for key in joined:
+                    if r not in self._room:
+                        break
+                    if key != r and key not in self._neighbours[r]:
+                        self._neighbours[r].add(key)
+                        self._holders.setdefault(key, set()).add(r)
+                        updates.setdefault(r, ([], []))[0].append({"ip": key[0], "port": key[1]})
+                        self._check_room(r)
+            return self.version, updates
+
+    def _touch(self, key):
+        now = time.time()
+        self._peers[key] = now
+        heapq.heappush(self._expiry, (now + self.ttl, key))
+
+    def _drop(self, key):
+        del self._peers[key]
+        last = self._order.pop()
+        if last != key:
+            self._order[self._pos[key]] = last
+            self._pos[last] = self._pos[key]
+        del self._pos[key]
+        self._unlink(key)
+        self._wanted.pop(key, None)
+        self._room.discard(key)
+        holders = self._holders.pop(key, set())
+        for h in holders:
+            self._neighbours[h].discard(key)
+            self._check_room(h)
+        self._record("left", key, frozenset(holders))
+
+    def _unlink(self, key):
+        for n in self._neighbours.pop(key, ()):
+            self._holders[n].discard(key)
+
+    def _check_room(self, key):
+        if len(self._neighbours[key]) < self._wanted[key]:
+            self._room.add(key)
+        else:
+            self._room.discard(key)
+
+    def _record(self, kind, key, holders=frozenset()):
+        self.version += 1
+        self._changes.append((self.version, kind, key, holders))
@@ -0,0 +1,177 @@
+# sigverify.py
+
+import hashlib
+import multiprocessing as mp
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from ecdsa import BadSignatureError, VerifyingKey
+
+CACHE_SIZE   = 100000   # verification results remembered
+BATCH_INLINE = 64       # batches smaller than this are verified in-process
+CHUNK_SIZE   = 256      # signatures sent to a worker process at a time
+
+class SignatureCache:
+    """
+    LRU cache of signature verification results keyed by
+    (public key, payload digest, signature).
+    """
+    def __init__(self, size=CACHE_SIZE):
+        """
+        Args:
+            size (int, optional): Maximum number of results kept. Defaults to CACHE_SIZE.
+        """
+        self.size = size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a cached result.
+
+        Args:
+            key (tuple): Cache key from cache_key().
+
+        Returns:
+            bool or None: The cached result, or None if not cached.
+        """
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        """
+        Remember a verification result.
+
+        Args:
+            key (tuple): Cache key from cache_key().
+            result (bool): Whether the signature was valid.
+        """
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+    def __len__(self):
+        return len(self._results)
+
+cache = SignatureCache()
+_executor = None
+_executor_lock = threading.Lock()
+_worker_keys = {}       # per-process cache of decoded keys, keyed by DER bytes
+
+def cache_key(vk_der, payload, sig_hex):
+    """
+    Build the cache key for one signature check.
+
+    Args:
+        vk_der (bytes): DER encoding of the public key.
+        payload (bytes): Signed payload.
+        sig_hex (str): Hex-encoded signature.
+
+    Returns:
+        tuple: (key digest, payload digest, signature).
+    """
+    return (hashlib.sha256(vk_der).digest(), hashlib.sha256(payload).digest(), sig_hex)
+
+def _verify_one(vk, payload, sig_hex):
+    """
+    Verify a single signature, treating malformed signatures as invalid.
+
+    Args:
+        vk (VerifyingKey): Public key.
+        payload (bytes): Signed payload.
+        sig_hex (str): Hex-encoded signature.
+
+    Returns:
+        bool: True if the signature is valid.
+    """
+    try:
+        return vk.verify(bytes.fromhex(sig_hex), payload)
+    except (BadSignatureError, ValueError, AssertionError):
+        return False
+
+def _verify_chunk(chunk):
+    """
+    Worker process entry point: verify a list of (key DER, payload, signature) items.
+
+    Args:
+        chunk (list): Items to verify.
+
+    Returns:
+        list: One bool per item.
+    """
+    results = []
+    for der, payload, sig_hex in chunk:
+        vk = _worker_keys.get(der)
+        if vk is None:
+            vk = _worker_keys[der] = VerifyingKey.from_der(der)
+        results.append(_verify_one(vk, payload, sig_hex))
+    return results
+
+def _get_executor(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=mp.get_context("spawn"))
+        return _executor
+
+def verify_signature(vk, payload, sig_hex):
+    """
+    Verify one signature, consulting and filling the shared cache.
+
+    Args:
+        vk (VerifyingKey): Public key.
+        payload (bytes): Signed payload.
+        sig_hex (str): Hex-encoded signature.
+
+    Returns:
+        bool: True if the signature is valid.
+    """
+    key = cache_key(vk.to_der(), payload, sig_hex)
+    result = cache.get(key)
+    if result is None:
+        result = _verify_one(vk, payload, sig_hex)
+        cache.put(key, result)
+    return result
+
+def verify_batch(items, workers=None):
+    """
+    Verify many signatures, skipping those already in the cache and spreading
+    the rest across a process pool.
+
+    Args:
+        items (list): (VerifyingKey, payload bytes, signature hex) tuples.
+        workers (int, optional): Worker processes for large batches. Defaults to the CPU count.
+
+    Returns:
+        list: One bool per item, in order.
+    """
+    results = [None] * len(items)
+    todo = []
+    for i, (vk, payload, sig_hex) in enumerate(items):
+        der = vk.to_der()
+        key = cache_key(der, payload, sig_hex)
+        cached = cache.get(key)
+        if cached is None:
+            todo.append((i, key, (der, payload, sig_hex)))
+        else:
+            results[i] = cached
+
+    if len(todo) < BATCH_INLINE:
+        fresh = _verify_chunk([item for _, _, item in todo])
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunks = [[item for _, _, item in todo[a:a+CHUNK_SIZE]]
+                  for a in range(0, len(todo), CHUNK_SIZE)]
+        fresh = [r for part in _get_executor(workers).map(_verify_chunk, chunks) for r in part]
+
+    for (i, key, _), result in zip(todo, fresh):
+        cache.put(key, result)
+        results[i] = result
+    return results
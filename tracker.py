@@ -1,12 +1,21 @@
 # tracker.py
 
+import asyncio
 import socket
+import sys
 import threading
-import json
 import time
+from pool import AsyncConnectionPool, ConnectionPool
+from registry import PeerRegistry
+from wire import encode_msg, read_msg, recv_msg, send_msg
 
-peer_list = []      # each entry: { ip, port, last_seen }
 TTL = 30            # seconds before we consider a peer dead
+PRUNE_INTERVAL = 1  # seconds between expiry checks
+SAMPLE_SIZE = 8     # peers handed out per request unless the peer asks for another number
+MAX_SAMPLE = 32     # most peers handed out per request
+MAX_REQUEST_SIZE = 4096     # tracker messages are tiny; reject anything larger
+registry = PeerRegistry(TTL)    # live peers by (ip, port), with versioned membership
+pool = ConnectionPool()     # long-lived connections used for UPDATE_PEERS pushes; loop-driven under --asyncio
 
 def handle_client(conn, addr):
     """
@@ -16,77 +25,131 @@ def handle_client(conn, addr):
         conn (socket): The socket connection object.
         addr (tuple): The address (IP, port) of the connecting peer.
     """
-    global peer_list
     try:
-        data = conn.recv(1024).decode()
-        msg  = json.loads(data)
-
-        # — Heartbeat —
-        if msg.get("type") == "HEARTBEAT":
-            for p in peer_list:
-                if p["ip"] == addr[0] and p["port"] == msg["port"]:
-                    p["last_seen"] = time.time()
-                    break
-            conn.sendall(b"{}")
+        msg = recv_msg(conn, MAX_REQUEST_SIZE)
+        if msg is None:
             return
+        handle_request(msg, addr[0], lambda m: send_msg(conn, m))
+    except Exception as e:
+        print("[TRACKER] Error handling client:", e)
+    finally:
+        conn.close()
 
-        # — JOIN —
-        if msg.get("type") == "JOIN":
-            new_peer = {"ip": addr[0], "port": msg["port"], "last_seen": time.time()}
-            if not any(p["ip"] == new_peer["ip"] and p["port"] == new_peer["port"]
-                       for p in peer_list):
-                peer_list.append(new_peer)
-            print(f"[TRACKER] Peer joined: {new_peer}")
-            conn.sendall(json.dumps({"peers": peer_list}).encode())
-            broadcast_peer_list()
-
-        # — LEAVE —
-        elif msg.get("type") == "LEAVE":
-            peer_list[:] = [
-                p for p in peer_list
-                if not (p["ip"] == addr[0] and p["port"] == msg["port"])
-            ]
-            print(f"[TRACKER] Peer left: {addr[0]}:{msg['port']}")
-            conn.sendall(json.dumps({"status": "removed"}).encode())
-            broadcast_peer_list()
-
-        # — GET —
-        elif msg.get("type") == "GET":
-            conn.sendall(json.dumps({"peers": peer_list}).encode())
+async def handle_client_stream(reader, writer):
+    """
+    Handle one peer connection on the tracker's event loop.
 
+    Args:
+        reader (asyncio.StreamReader): Incoming side of the connection.
+        writer (asyncio.StreamWriter): Outgoing side of the connection.
+    """
+    ip = writer.get_extra_info("peername")[0]
+    try:
+        msg = await read_msg(reader, MAX_REQUEST_SIZE)
+        if msg is not None:
+            # UPDATE_PEERS pushes are queued on this loop's connection pool and
+            # never block, so requests are handled here directly.
+            handle_request(msg, ip, lambda m: writer.write(encode_msg(m)))
+            await writer.drain()
     except Exception as e:
         print("[TRACKER] Error handling client:", e)
     finally:
-        conn.close()
+        writer.close()
+
+def handle_request(msg, ip, reply):
+    """
+    Process one tracker request.
 
-def broadcast_peer_list():
+    Args:
+        msg (dict): The decoded request.
+        ip (str): IP address of the requesting peer.
+        reply (callable): Sends a response message to the peer.
     """
-    Push the current list of known peers to every peer in the network.
+    # — Heartbeat —
+    if msg.get("type") == "HEARTBEAT":
+        base = registry.version
+        if registry.heartbeat(ip, msg["port"]):
+            print(f"[TRACKER] Peer rejoined: {ip}:{msg['port']}")
+            broadcast_changes(base)
+        reply({})
+
+    # — JOIN —
+    elif msg.get("type") == "JOIN":
+        base = registry.version
+        new = registry.join(ip, msg["port"])
+        print(f"[TRACKER] Peer joined: {ip}:{msg['port']}")
+        version, peers = registry.sample(sample_size(msg), exclude=(ip, msg["port"]))
+        reply({"peers": peers, "version": version,
+               "address": {"ip": ip, "port": msg["port"]}})
+        if new:
+            broadcast_changes(base)
+
+    # — LEAVE —
+    elif msg.get("type") == "LEAVE":
+        base = registry.version
+        if registry.leave(ip, msg["port"]):
+            print(f"[TRACKER] Peer left: {ip}:{msg['port']}")
+            broadcast_changes(base, [(ip, msg["port"])])
+        reply({"status": "removed"})
+
+    # — GET —
+    elif msg.get("type") == "GET":
+        keep = [(p["ip"], p["port"]) for p in msg.get("have", ())]
+        version, peers = registry.sample(sample_size(msg), exclude=(ip, msg.get("port")),
+                                         keep=keep)
+        reply({"peers": peers, "version": version})
+
+def sample_size(msg):
     """
-    for p in peer_list:
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((p["ip"], p["port"]))
-            s.sendall(json.dumps({
-                "type": "UPDATE_PEERS",
-                "peers": peer_list
-            }).encode())
-            s.close()
-        except:
-            pass
+    Work out how many peers to hand out for a request.
+
+    Args:
+        msg (dict): The request, optionally with "sample".
+
+    Returns:
+        int: Number of peers, at most MAX_SAMPLE.
+    """
+    return max(0, min(int(msg.get("sample", SAMPLE_SIZE)), MAX_SAMPLE))
+
+def broadcast_changes(base, removed=()):
+    """
+    Push the membership changes made since version `base` as UPDATE_PEERS
+    deltas, only to the peers they affect: those that were handed a departed
+    peer, and those with room for a new one. Peers sent the same delta share
+    one encoded message.
+
+    Args:
+        base (int): Registry version before the changes.
+        removed (iterable, optional): (ip, port) of peers whose connections can be closed.
+    """
+    delta = registry.updates_since(base)
+    if delta is None:
+        return
+    version, updates = delta
+    for ip, port in removed:
+        pool.drop(ip, port)
+    groups = {}
+    for (ip, port), (joined, left) in updates.items():
+        group = repr((joined, left))
+        if group not in groups:
+            groups[group] = ({"type": "UPDATE_PEERS", "version": version,
+                              "joined": joined, "left": left}, [])
+        groups[group][1].append({"ip": ip, "port": port})
+    for msg, peers in groups.values():
+        pool.broadcast(peers, msg)
 
 def prune_stale_peers():
     """
     Periodically remove peers that have not sent a heartbeat within the TTL window.
+    Only peers whose deadline has passed are examined.
     """
     while True:
-        now = time.time()
-        before = len(peer_list)
-        peer_list[:] = [p for p in peer_list if now - p["last_seen"] <= TTL]
-        if len(peer_list) != before:
-            print(f"[TRACKER] Pruned stale peers → {len(peer_list)} remaining")
-            broadcast_peer_list()
-        time.sleep(TTL)
+        base = registry.version
+        removed = registry.expire()
+        if removed:
+            print(f"[TRACKER] Pruned {len(removed)} stale peer(s) → {len(registry)} remaining")
+            broadcast_changes(base, removed)
+        time.sleep(PRUNE_INTERVAL)
 
 def start_tracker(port=9000):
     """
@@ -106,5 +169,26 @@ def start_tracker(port=9000):
         conn, addr = s.accept()
         threading.Thread(target=handle_client, args=(conn, addr)).start()
 
+def start_tracker_async(port=9000):
+    """
+    Start the tracker server on a single asyncio event loop instead of a thread per connection.
+
+    Args:
+        port (int): Port to listen on. Defaults to 9000.
+    """
+    async def serve():
+        global pool
+        pool = AsyncConnectionPool(asyncio.get_running_loop())
+        server = await asyncio.start_server(handle_client_stream, "", port)
+        print(f"[TRACKER] Listening on port {port} (asyncio)")
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=prune_stale_peers, daemon=True).start()
+    asyncio.run(serve())
+
 if __name__ == "__main__":
-    start_tracker()
+    if "--asyncio" in sys.argv:
+        start_tracker_async()
+    else:
+        start_tracker()
@@ -0,0 +1,219 @@
+# wire.py
+
+import asyncio
+import json
+import socket
+import struct
+from codec import decode_payload, encode_binary
+
+HEADER = struct.Struct("!I")            # 4-byte big-endian payload length
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024      # largest single frame we accept
+JSON   = "json"                         # codec names offered in HELLO, preferred first
+BINARY = "bin2"
+CODECS = (BINARY, JSON)
+HELLO_TIMEOUT = 2                       # seconds to wait for a HELLO reply before assuming JSON
+
+def encode_msg(msg, codec=JSON, compress=False):
+    """
+    Serialize a message into a length-prefixed frame.
+
+    Args:
+        msg (dict): Message to encode.
+        codec (str, optional): JSON or BINARY. Messages with no binary form are
+            always sent as JSON. Defaults to JSON.
+        compress (bool, optional): Compress large binary payloads. Defaults to False.
+
+    Returns:
+        bytes: Length header followed by the payload.
+    """
+    payload = None
+    if codec == BINARY:
+        try:
+            payload = encode_binary(msg, compress)
+        except ValueError:
+            pass
+    if payload is None:
+        payload = json.dumps(msg).encode()
+    return HEADER.pack(len(payload)) + payload
+
+def send_msg(sock, msg, codec=JSON, compress=False):
+    """
+    Send one framed message over a socket.
+
+    Args:
+        sock (socket): Connected socket.
+        msg (dict): Message to send.
+        codec (str, optional): Codec negotiated for the connection. Defaults to JSON.
+        compress (bool, optional): Compress large binary payloads. Defaults to False.
+    """
+    sock.sendall(encode_msg(msg, codec, compress))
+
+def hello_msg(compress=False):
+    """
+    Build the HELLO message offering the codecs this node understands.
+
+    Args:
+        compress (bool, optional): Ask the other side to compress bulk replies. Defaults to False.
+
+    Returns:
+        dict: The HELLO message.
+    """
+    return {"type": "HELLO", "codecs": list(CODECS), "compress": compress}
+
+def answer_hello(msg):
+    """
+    Pick the codec for a connection from the other side's HELLO.
+
+    Args:
+        msg (dict): The HELLO received.
+
+    Returns:
+        dict: The HELLO reply, with the chosen "codec" and "compress" settings, which
+            are also the keyword arguments for sending on this connection.
+    """
+    codec = next((c for c in CODECS if c in msg.get("codecs", ())), JSON)
+    return {"type": "HELLO", "codec": codec,
+            "compress": bool(msg.get("compress")) and codec == BINARY}
+
+def negotiate(sock, compress=False, timeout=HELLO_TIMEOUT):
+    """
+    Send HELLO on a new connection and wait for the reply. Peers that do not
+    answer in time are treated as JSON-only.
+
+    Args:
+        sock (socket): Newly connected socket.
+        compress (bool, optional): Ask for compressed bulk replies. Defaults to False.
+        timeout (float, optional): Seconds to wait for the reply. Defaults to HELLO_TIMEOUT.
+
+    Returns:
+        str: The codec to use when sending on this connection.
+    """
+    previous = sock.gettimeout()
+    sock.settimeout(timeout)
+    try:
+        send_msg(sock, hello_msg(compress))
+        reply = recv_msg(sock)
+    except (socket.timeout, ValueError):
+        reply = None
+    finally:
+        sock.settimeout(previous)
+    if reply is None or reply.get("type") != "HELLO":
+        return JSON
+    return reply.get("codec", JSON)
+
+def recv_exact(sock, n):
+    """
+    Read exactly `n` bytes from a socket.
+
+    Args:
+        sock (socket): Connected socket.
+        n (int): Number of bytes to read.
+
+    Returns:
+        bytes or None: The bytes read, or None if the peer closed the connection
+            before sending anything.
+
+    Raises:
+        ConnectionError: If the connection closes part way through.
+    """
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(min(n - len(buf), 65536))
+        if not chunk:
+            if not buf:
+                return None
+            raise ConnectionError("connection closed mid-frame")
+        buf += chunk
+    return bytes(buf)
+
+def recv_msg(sock, max_size=MAX_MESSAGE_SIZE):
+    """
+    Read one framed message from a socket.
+
+    Args:
+        sock (socket): Connected socket.
+        max_size (int, optional): Largest payload to accept. Defaults to MAX_MESSAGE_SIZE.
+
+    Returns:
+        dict or None: The decoded message (JSON or binary, detected per frame), or
+            None on a clean end of stream.
+
+    Raises:
+        ValueError: If the frame is larger than `max_size` or malformed.
+        ConnectionError: If the connection closes part way through a frame.
+    """
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > max_size:
+        raise ValueError(f"frame of {size} bytes exceeds limit of {max_size}")
+    payload = recv_exact(sock, size) if size else b""
+    if payload is None:
+        raise ConnectionError("connection closed mid-frame")
+    return decode_payload(payload)
+
+async def read_msg(reader, max_size=MAX_MESSAGE_SIZE):
+    """
+    Read one framed message from an asyncio stream.
+
+    Args:
+        reader (asyncio.StreamReader): Stream to read from.
+        max_size (int, optional): Largest payload to accept. Defaults to MAX_MESSAGE_SIZE.
+
+    Returns:
+        dict or None: The decoded message (JSON or binary, detected per frame), or
+            None on a clean end of stream.
+
+    Raises:
+        ValueError: If the frame is larger than `max_size` or malformed.
+        asyncio.IncompleteReadError: If the stream ends part way through a frame.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+    (size,) = HEADER.unpack(header)
+    if size > max_size:
+        raise ValueError(f"frame of {size} bytes exceeds limit of {max_size}")
+    payload = await reader.readexactly(size)
+    return decode_payload(payload)
+
+def chain_frames(blocks):
+    """
+    Yield the frames of a streamed chain: a RESPONSE_CHAIN header followed by one BLOCK frame each.
+
+    Args:
+        blocks (list): Blocks to send, in chain order.
+
+    Yields:
+        dict: Each message to send.
+    """
+    yield {"type": "RESPONSE_CHAIN", "count": len(blocks)}
+    for b in blocks:
+        yield {"type": "BLOCK", "block": b}
+
+def iter_chain(sock, header):
+    """
+    Yield the blocks of a streamed RESPONSE_CHAIN one at a time.
+
+    Args:
+        sock (socket): Connected socket positioned after the RESPONSE_CHAIN header.
+        header (dict): The RESPONSE_CHAIN header frame.
+
+    Yields:
+        dict: Each block in chain order.
+
+    Raises:
+        ValueError: If the stream contains an unexpected frame.
+        ConnectionError: If the stream ends early.
+    """
+    for _ in range(header.get("count", 0)):
+        msg = recv_msg(sock)
+        if msg is None:
+            raise ConnectionError("chain stream ended early")
+        if msg.get("type") != "BLOCK":
+            raise ValueError(f"unexpected {msg.get('type')} frame in chain stream")
+        yield msg["block"]